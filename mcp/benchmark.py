@@ -0,0 +1,352 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import datetime
+import platform
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+# Load test for the FastMCP servers (HelloWorldServer, WeatherMCPServer) over streamable-http.
+# N concurrent ClientSessions run a weighted mix of operations discovered from the server
+# (tool calls, static and templated resource reads, prompts, list_* calls) for a fixed
+# duration; latency percentiles, throughput, session setup cost and server RSS are printed
+# and written as JSON so runs can be diffed between versions.
+#
+#   python server.py &                                # in mcp/hellowworld or mcp/mcp_openai_example
+#   python benchmark.py --sessions 32 --duration 30 --server-pid $! --output results.json
+
+# ─── Configuration ────────────────────────────────────────────────────
+
+DEFAULT_MIX = "call_tool=5,read_resource=2,read_template=2,get_prompt=1,list=1"
+
+# Known-good arguments for the sample tools; other tools get arguments built from their schema
+TOOL_ARGUMENTS: Dict[str, Dict[str, Any]] = {
+    "add": {"a": 2, "b": 3},
+    "get_weather": {"city": "New York"},
+}
+
+# Values for resource template parameters; the sample document ships with the hello-world server
+TEMPLATE_VALUES = {"name": "example.md", "index": "0", "offset": "0", "length": "64"}
+
+SCHEMA_SAMPLES = {"integer": 1, "number": 1.5, "string": "benchmark", "boolean": True, "array": [], "object": {}}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for item in value.split(","):
+        name, sep, weight = item.strip().partition("=")
+        if sep and name.strip():
+            mix[name.strip()] = float(weight)
+    return mix
+
+
+def sample_arguments(tool: Any) -> Dict[str, Any]:
+    if tool.name in TOOL_ARGUMENTS:
+        return TOOL_ARGUMENTS[tool.name]
+    schema = tool.inputSchema or {}
+    return {
+        name: SCHEMA_SAMPLES.get(prop.get("type"), "benchmark")
+        for name, prop in schema.get("properties", {}).items()
+        if name in schema.get("required", [])
+    }
+
+
+def fill_template(uri_template: str) -> str:
+    # file://documents/{name}/chunks/{index} -> file://documents/example.md/chunks/0
+    out, _, rest = uri_template.partition("{")
+    while rest:
+        name, _, rest = rest.partition("}")
+        out += TEMPLATE_VALUES.get(name, "benchmark.txt")
+        chunk, _, rest = rest.partition("{")
+        out += chunk
+    return out
+
+
+# ─── Server Memory ────────────────────────────────────────────────────
+
+def process_tree(pid: int) -> List[int]:
+    """`pid` and all of its descendants, so multi-worker servers are measured whole."""
+    parents: Dict[int, List[int]] = {}
+    try:
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    with open(f"/proc/{entry}/stat", "r") as f:
+                        # The command name may contain spaces; the parent pid follows its closing ")"
+                        ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+                except (OSError, IndexError, ValueError):
+                    continue
+                parents.setdefault(ppid, []).append(int(entry))
+    except OSError:
+        try:
+            import psutil
+            return [pid] + [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except Exception:
+            return [pid]
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(parents.get(current, []))
+    return tree
+
+
+def read_rss(pid: int) -> Optional[int]:
+    """Resident set size of `pid` in bytes (procfs, or psutil when installed)."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return None
+
+
+async def sample_rss(pid: int, samples: List[int], processes: List[int], stop: asyncio.Event,
+                     interval: float = 0.25):
+    # Summed over the server process and its workers; shared pages are counted once per process
+    while not stop.is_set():
+        tree = process_tree(pid)
+        values = [rss for rss in map(read_rss, tree) if rss is not None]
+        if values:
+            samples.append(sum(values))
+            processes.append(len(values))
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ─── Workload ─────────────────────────────────────────────────────────
+
+Operation = Tuple[str, Callable[[ClientSession], Awaitable[Any]]]
+
+
+async def discover_operations(session: ClientSession, capabilities: Any,
+                              mix: Dict[str, float]) -> Tuple[List[Operation], List[float]]:
+    """Build the weighted operation list from what the server exposes."""
+    groups: Dict[str, List[Operation]] = {name: [] for name in mix}
+
+    tools = (await session.list_tools()).tools
+    for tool in tools:
+        args = sample_arguments(tool)
+        groups.setdefault("call_tool", []).append(
+            (f"call_tool:{tool.name}", lambda s, name=tool.name, args=args: s.call_tool(name, arguments=args)))
+
+    if capabilities.resources:
+        for resource in (await session.list_resources()).resources:
+            groups.setdefault("read_resource", []).append(
+                (f"read_resource:{resource.uri}", lambda s, uri=resource.uri: s.read_resource(uri)))
+        for template in (await session.list_resource_templates()).resourceTemplates:
+            uri = fill_template(template.uriTemplate)
+            groups.setdefault("read_template", []).append(
+                (f"read_template:{template.uriTemplate}", lambda s, uri=uri: s.read_resource(uri)))
+    if capabilities.prompts:
+        for prompt in (await session.list_prompts()).prompts:
+            args = {arg.name: "def add(a, b): return a + b" for arg in prompt.arguments or []}
+            groups.setdefault("get_prompt", []).append(
+                (f"get_prompt:{prompt.name}", lambda s, name=prompt.name, args=args: s.get_prompt(name, arguments=args)))
+
+    groups.setdefault("list", []).append(("list_tools", lambda s: s.list_tools()))
+    if capabilities.resources:
+        groups["list"].append(("list_resources", lambda s: s.list_resources()))
+        groups["list"].append(("list_resource_templates", lambda s: s.list_resource_templates()))
+    if capabilities.prompts:
+        groups["list"].append(("list_prompts", lambda s: s.list_prompts()))
+
+    # A group's weight is shared by its operations; groups the server does not support drop out
+    operations: List[Operation] = []
+    weights: List[float] = []
+    for name, weight in mix.items():
+        for operation in groups.get(name, []):
+            operations.append(operation)
+            weights.append(weight / len(groups[name]))
+    return operations, weights
+
+
+class SessionResult:
+    def __init__(self):
+        self.setup: Optional[float] = None
+        self.error: Optional[str] = None
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.server_info: Optional[Dict[str, Any]] = None
+
+
+async def run_session(url: str, mix: Dict[str, float], start_at: float, end_at: float, seed: int) -> SessionResult:
+    result = SessionResult()
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    try:
+        started = time.perf_counter()
+        async with streamablehttp_client(url=url) as (read_stream, write_stream, _):
+            async with ClientSession(read_stream, write_stream) as session:
+                init = await session.initialize()
+                result.setup = time.perf_counter() - started
+                result.server_info = {"name": init.serverInfo.name, "version": init.serverInfo.version}
+                operations, weights = await discover_operations(session, init.capabilities, mix)
+
+                # All sessions start measuring together, after every handshake is done
+                await asyncio.sleep(max(0.0, start_at - loop.time()))
+                while loop.time() < end_at:
+                    name, call = rng.choices(operations, weights)[0]
+                    op_started = time.perf_counter()
+                    try:
+                        outcome = await call(session)
+                    except Exception:
+                        result.errors[name] = result.errors.get(name, 0) + 1
+                        continue
+                    # Tool failures come back as results flagged isError, not as exceptions
+                    if getattr(outcome, "isError", False):
+                        result.errors[name] = result.errors.get(name, 0) + 1
+                    else:
+                        result.latencies.setdefault(name, []).append(time.perf_counter() - op_started)
+    except Exception as e:
+        # Transport failures arrive wrapped in anyio exception groups
+        while isinstance(e, BaseExceptionGroup) and e.exceptions:
+            e = e.exceptions[0]
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+# ─── Report ───────────────────────────────────────────────────────────
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    # Nearest-rank percentile
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(values: List[float], duration: float, errors: int = 0) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "errors": errors,
+        "throughput_per_s": round(len(values) / duration, 2) if duration else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(max(values) * 1000, 3) if values else 0.0,
+    }
+
+
+def build_report(args: argparse.Namespace, results: List[SessionResult], rss: List[int], processes: List[int],
+                 duration: float) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for result in results:
+        for name, values in result.latencies.items():
+            latencies.setdefault(name, []).extend(values)
+        for name, count in result.errors.items():
+            errors[name] = errors.get(name, 0) + count
+
+    setups = [result.setup for result in results if result.setup is not None]
+    all_latencies = [value for values in latencies.values() for value in values]
+    server_info = next((result.server_info for result in results if result.server_info), None)
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "url": args.url,
+            "sessions": args.sessions,
+            "duration_s": args.duration,
+            "mix": parse_mix(args.mix),
+            "seed": args.seed,
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "server": server_info,
+        "sessions": {
+            "connected": len(setups),
+            "failed": [result.error for result in results if result.error],
+            "setup": summarize(setups, 0),
+        },
+        "overall": summarize(all_latencies, duration, sum(errors.values())),
+        "operations": {
+            name: summarize(latencies.get(name, []), duration, errors.get(name, 0))
+            for name in sorted(set(latencies) | set(errors))
+        },
+        "server_rss": {
+            "pid": args.server_pid,
+            "processes": max(processes) if processes else None,
+            "start_bytes": rss[0] if rss else None,
+            "peak_bytes": max(rss) if rss else None,
+            "end_bytes": rss[-1] if rss else None,
+        },
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    overall = report["overall"]
+    setup = report["sessions"]["setup"]
+    print(f"\n{(report['server'] or {}).get('name', 'unreachable server')} @ {report['config']['url']}: "
+          f"{report['sessions']['connected']}/{report['config']['sessions']} session(s), {report['config']['duration_s']}s")
+    print(f"session setup: p50 {setup['p50_ms']} ms, p95 {setup['p95_ms']} ms, max {setup['max_ms']} ms")
+    print(f"{'operation':<45}{'count':>8}{'err':>6}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in list(report["operations"].items()) + [("overall", overall)]:
+        print(f"{name:<45}{stats['count']:>8}{stats['errors']:>6}{stats['throughput_per_s']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    rss = report["server_rss"]
+    if rss["peak_bytes"]:
+        print(f"server RSS ({rss['processes']} process(es)): start {rss['start_bytes'] / 2**20:.1f} MiB, peak {rss['peak_bytes'] / 2**20:.1f} MiB, "
+              f"end {rss['end_bytes'] / 2**20:.1f} MiB")
+    for error in report["sessions"]["failed"][:5]:
+        print(f"session failed: {error}")
+
+
+# ─── Entry Point ──────────────────────────────────────────────────────
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    loop = asyncio.get_running_loop()
+    # Handshakes get a head start so the measured window only covers the steady-state mix
+    start_at = loop.time() + args.setup_window
+    end_at = start_at + args.duration
+
+    rss: List[int] = []
+    processes: List[int] = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(args.server_pid, rss, processes, stop)) if args.server_pid else None
+    try:
+        results = await asyncio.gather(*(
+            run_session(args.url, mix, start_at, end_at, args.seed + index) for index in range(args.sessions)
+        ))
+    finally:
+        stop.set()
+        if sampler:
+            await sampler
+
+    report = build_report(args, results, rss, processes, args.duration)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a FastMCP server over streamable-http")
+    parser.add_argument("--url", default=os.getenv("MCP_SERVER_URL", "http://127.0.0.1:8080/mcp"))
+    parser.add_argument("--sessions", type=int, default=16, help="concurrent client sessions")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds of load")
+    parser.add_argument("--setup-window", type=float, default=5.0, help="seconds allowed for all handshakes before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights, e.g. call_tool=5,read_resource=2,list=1")
+    parser.add_argument("--server-pid", type=int, help="sample the RSS of this process and its workers during the run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    report = asyncio.run(main(parser.parse_args()))
+    sys.exit(1 if report["sessions"]["connected"] == 0 else 0)
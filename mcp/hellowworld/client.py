@@ -1,19 +1,102 @@
-from mcp import ClientSession
+import asyncio
+import argparse
+
+from mcp import ClientSession, McpError, types
 from mcp.client.streamable_http import streamablehttp_client
 from mcp.types import PromptReference
+from pydantic import AnyUrl
 
 server_endpoint = "http://127.0.0.1:8080/mcp"
 headers = {}
 
-async def run():
+
+class ResourceMirror:
+    # Local copy of the server's resource list and of every resource read through it.
+    # When the server supports subscriptions the copy is refreshed only when it reports
+    # a change (resources/updated, resources/list_changed); otherwise it is read once.
+    def __init__(self):
+        self.session = None
+        self.subscribe = False
+        self.resources = {}  # uri -> Resource, from the (paginated) listing
+        self.contents = {}  # uri -> contents of the last read
+        self.pending = set()
+
+    async def start(self, session, capabilities):
+        self.session = session
+        self.subscribe = bool(capabilities.resources and capabilities.resources.subscribe)
+        await self.sync_list()
+
+    async def sync_list(self):
+        resources = {}
+        cursor = None
+        while True:
+            result = await self.session.list_resources(cursor) if cursor else await self.session.list_resources()
+            resources.update((str(resource.uri), resource) for resource in result.resources)
+            cursor = result.nextCursor
+            if not cursor:
+                break
+        # Content of listed resources that disappeared is dropped; changed ones get their own update
+        for uri in set(self.resources) - set(resources):
+            self.contents.pop(uri, None)
+        self.resources = resources
+
+    async def read(self, uri):
+        if uri not in self.contents:
+            # Subscribe first so a change right after the read is not missed
+            if self.subscribe:
+                await self.session.subscribe_resource(AnyUrl(uri))
+            self.contents[uri] = (await self.session.read_resource(AnyUrl(uri))).contents
+        return self.contents[uri]
+
+    async def refresh(self, uri):
+        try:
+            self.contents[uri] = (await self.session.read_resource(AnyUrl(uri))).contents
+            print(f"\nUpdated {uri}: {describe(self.contents[uri])}")
+        except McpError:
+            self.contents.pop(uri, None)
+            print(f"\nRemoved {uri}")
+
+    async def handle(self, message):
+        # Called from the session's receive loop, which must not wait on requests of its
+        # own, so the re-reads run as separate tasks
+        if not isinstance(message, types.ServerNotification):
+            return
+        notification = message.root
+        if isinstance(notification, types.ResourceUpdatedNotification):
+            uri = str(notification.params.uri)
+            if uri in self.contents:
+                self.schedule(self.refresh(uri))
+        elif isinstance(notification, types.ResourceListChangedNotification):
+            self.schedule(self.list_changed())
+
+    async def list_changed(self):
+        await self.sync_list()
+        print(f"\nResource list changed: {len(self.resources)} resource(s)")
+
+    def schedule(self, coro):
+        task = asyncio.create_task(coro)
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+
+def describe(contents):
+    return ", ".join(
+        f"{content.text!r} ({content.mimeType})" if isinstance(content, types.TextResourceContents)
+        else f"{len(content.blob)} base64 characters ({content.mimeType})"
+        for content in contents
+    )
+
+
+async def run(watch=False):
+    mirror = ResourceMirror()
     async with streamablehttp_client(url=server_endpoint, headers=headers) as (
         read_stream,
         write_stream,
         _,
     ):
-        async with ClientSession(read_stream, write_stream) as session:
+        async with ClientSession(read_stream, write_stream, message_handler=mirror.handle) as session:
             # Initialize connection
-            await session.initialize()
+            initialized = await session.initialize()
 
             # List available prompts
             prompts = await session.list_prompts()
@@ -28,10 +111,11 @@ async def run():
             )
             print("\nResult of prompt:", prompt)
 
-            # List resources
-            resources = await session.list_resources()
-            print("\nAvailable resources:", resources)
-            res_list = await session.list_resources()
+            # List resources (all pages) into the local mirror
+            await mirror.start(session, initialized.capabilities)
+            print(f"\nAvailable resources ({len(mirror.resources)}, subscriptions {'on' if mirror.subscribe else 'off'}):")
+            for uri in mirror.resources:
+                print(f"  - {uri}")
 
             # List available resource templates
             templates = await session.list_resource_templates()
@@ -42,13 +126,11 @@ async def run():
 
             # Try reading the static resource
             print("\nReading static resource hello.txt:")
-            content, mime = await session.read_resource("file://documents/hello.txt")
-            print("  content:", content, "mime:", mime)
+            print("  content:", describe(await mirror.read("file://documents/hello.txt")))
 
             # Try reading via template
             print("\nReading resource template (name = example.md):")
-            content2, mime2 = await session.read_resource("file://documents/example.md")
-            print("  content:", content2, "mime:", mime2)
+            print("  content:", describe(await mirror.read("file://documents/example.md")))
 
 
             # List tools
@@ -59,7 +141,15 @@ async def run():
             result = await session.call_tool("add", arguments={"a": 2, "b": 3})
             print("Result of add tool:", result)
 
+            # Keep the mirror current until interrupted; nothing is polled
+            if watch and mirror.subscribe:
+                print("\nWatching for resource changes (Ctrl+C to stop)")
+                await asyncio.Event().wait()
+
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(run())
+    parser = argparse.ArgumentParser(description="Exercise the HelloWorld MCP server")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and refresh the resource mirror from server notifications")
+    args = parser.parse_args()
+    asyncio.run(run(watch=args.watch))
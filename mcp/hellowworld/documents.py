@@ -0,0 +1,169 @@
+# File-backed document store behind the file://documents resources.
+# Documents live in one flat directory. Reads go through memory maps kept in a small
+# LRU, so hot files stay mapped, their pages come from the OS page cache and a request
+# copies only the bytes it returns. Large files are read in fixed-size chunks or byte
+# ranges, never as one message. Every document has an ETag built from its inode, size
+# and mtime, so clients can check whether their copy is still current without
+# re-reading it. The directory listing is indexed and only rescanned when the
+# directory itself changes.
+
+import os
+import mmap
+import stat
+import bisect
+import mimetypes
+import threading
+from collections import OrderedDict
+from urllib.parse import quote
+
+URI_PREFIX = "file://documents/"
+
+
+def document_uri(name):
+    return URI_PREFIX + quote(name)
+
+
+class DocumentStore:
+    def __init__(self, root, chunk_bytes, max_read_bytes, cache_size):
+        self.root = os.path.realpath(root)
+        self.chunk_bytes = chunk_bytes
+        self.max_read_bytes = max_read_bytes
+        self.cache_size = cache_size
+        self._names = []
+        self._index_mtime = None
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "rescans": 0}
+
+    def _path(self, name):
+        # Flat directory only: no separators, parent references or hidden files, and
+        # no symlinks pointing outside the directory
+        if not name or name.startswith(".") or "/" in name or (os.altsep and os.altsep in name):
+            raise ValueError(f"Invalid document name: {name}")
+        path = os.path.join(self.root, name)
+        if os.path.dirname(os.path.realpath(path)) != self.root:
+            raise ValueError(f"Invalid document name: {name}")
+        return name, path
+
+    def names(self):
+        # Adding, removing or renaming a file changes the directory's mtime; edits to
+        # existing files do not change the listing and are picked up by info()
+        try:
+            mtime = os.stat(self.root).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            if mtime != self._index_mtime:
+                self._names = sorted(
+                    entry.name for entry in os.scandir(self.root)
+                    if not entry.name.startswith(".") and entry.is_file()
+                )
+                self._index_mtime = mtime
+                self.stats["rescans"] += 1
+            return self._names
+
+    def page(self, cursor, limit):
+        # The cursor is the last name of the previous page, so pages stay stable while
+        # files come and go
+        names = self.names()
+        start = bisect.bisect_right(names, cursor) if cursor else 0
+        page = names[start:start + limit]
+        infos = []
+        for name in page:
+            try:
+                infos.append(self.info(name))
+            except (FileNotFoundError, ValueError):
+                # Removed (or replaced by something that is not a file) since the last scan
+                continue
+        return infos, page[-1] if start + limit < len(names) else None
+
+    def info(self, name):
+        name, path = self._path(name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            raise FileNotFoundError(f"Unknown document: {name}")
+        return {
+            "name": name,
+            "uri": document_uri(name),
+            "mime_type": mimetypes.guess_type(name)[0] or "application/octet-stream",
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "etag": f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"',
+            "chunk_bytes": self.chunk_bytes,
+            "chunks": max(1, -(-st.st_size // self.chunk_bytes)),
+        }
+
+    def etags(self, names):
+        # Current ETag of each document, None for documents that are gone
+        etags = {}
+        for name in names:
+            try:
+                etags[name] = self.info(name)["etag"]
+            except (FileNotFoundError, ValueError):
+                etags[name] = None
+        return etags
+
+    def _map(self, path, info):
+        # Maps are cached per version of a document: a new ETag means a new map, and the
+        # old one is closed once the last reader drops it
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached is not None and cached[0] == info["etag"]:
+                self._maps.move_to_end(path)
+                self.stats["hits"] += 1
+                return cached[1]
+            self.stats["misses"] += 1
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with self._lock:
+            self._maps[path] = (info["etag"], mapped)
+            self._maps.move_to_end(path)
+            while len(self._maps) > self.cache_size:
+                self._maps.popitem(last=False)
+                self.stats["evictions"] += 1
+        return mapped
+
+    def read(self, name, offset=0, length=None):
+        # Returns the bytes in [offset, offset + length) and the info they were read
+        # under. Files should be replaced (written elsewhere and renamed) rather than
+        # truncated in place while they are being served.
+        info = self.info(name)
+        size = info["size"]
+        if offset < 0 or offset > size or (length is not None and length < 0):
+            raise ValueError(f"Range {offset}+{length} is outside {info['name']} ({size} bytes)")
+        end = size if length is None else min(size, offset + length)
+        if offset == end:
+            return b"", info
+        _, path = self._path(name)
+        return self._map(path, info)[offset:end], info
+
+    def read_range(self, name, offset, length):
+        # Client-chosen ranges are capped like whole reads, so one request cannot pull
+        # a large file into a single message
+        if length > self.max_read_bytes:
+            raise ValueError(f"Range length {length} is over the {self.max_read_bytes}-byte read limit")
+        return self.read(name, offset, length)
+
+    def read_chunk(self, name, index):
+        info = self.info(name)
+        if not 0 <= index < info["chunks"]:
+            raise ValueError(f"{info['name']} has chunks 0 to {info['chunks'] - 1}")
+        return self.read(name, index * self.chunk_bytes, self.chunk_bytes)
+
+    def read_document(self, name):
+        # Whole documents up to max_read_bytes; text comes back as text, anything that is
+        # not UTF-8 as bytes
+        info = self.info(name)
+        if info["size"] > self.max_read_bytes:
+            raise ValueError(
+                f"{info['name']} is {info['size']} bytes; read it in chunks from "
+                f"{info['uri']}/chunks/0 to {info['uri']}/chunks/{info['chunks'] - 1}"
+            )
+        content, info = self.read(name)
+        try:
+            return content.decode("utf-8"), info
+        except UnicodeDecodeError:
+            return content, info
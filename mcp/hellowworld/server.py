@@ -1,10 +1,21 @@
+import os
+import json
+import asyncio
+import weakref
+import contextlib
+from urllib.parse import unquote
+
+import anyio
+from mcp import types
 from mcp.server.fastmcp import FastMCP
 from starlette.requests import Request
 
+from documents import URI_PREFIX, DocumentStore
+
 # Create an MCP server
 mcp = FastMCP(name="HelloWorldServer", 
-              host="0.0.0.0",
-              port=8080)
+              host=os.getenv("MCP_HOST", "0.0.0.0"),
+              port=int(os.getenv("MCP_PORT", "8080")))
 
 
 # Add a tool
@@ -21,11 +32,188 @@ def read_hello() -> str:
     """A static hello file."""
     return "Hello, static file!"
 
-# Dynamic resource template - this *will not* show in session.list_resource_templates()
+# Documents are served from DOCUMENTS_DIR (a flat directory). Whole reads are capped at
+# DOCUMENT_MAX_READ_BYTES; larger files are read in DOCUMENT_CHUNK_BYTES chunks or byte ranges.
+documents = DocumentStore(
+    os.getenv("DOCUMENTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "documents")),
+    chunk_bytes=int(os.getenv("DOCUMENT_CHUNK_BYTES", str(1024 * 1024))),
+    max_read_bytes=int(os.getenv("DOCUMENT_MAX_READ_BYTES", str(4 * 1024 * 1024))),
+    cache_size=int(os.getenv("DOCUMENT_CACHE_SIZE", "64")),
+)
+DOCUMENT_PAGE_SIZE = int(os.getenv("DOCUMENT_PAGE_SIZE", "500"))
+
+
+# Dynamic resource templates; file reads run in a worker thread so a cold page-in
+# does not stall the event loop
 @mcp.resource("file://documents/{name}")
-def read_document(name: str) -> str:
-    """Read a document by name via template."""
-    return f"Dynamic content of {name}"
+async def read_document(name: str) -> str | bytes:
+    """Read a whole document by name (text, or binary content for non-UTF-8 files)."""
+    content, _ = await anyio.to_thread.run_sync(documents.read_document, unquote(name))
+    return content
+
+
+@mcp.resource("file://documents/{name}/info", mime_type="application/json")
+async def read_document_info(name: str) -> str:
+    """Size, MIME type, ETag and chunk count of a document. Re-read only when the ETag changed."""
+    return json.dumps(await anyio.to_thread.run_sync(documents.info, unquote(name)))
+
+
+@mcp.resource("file://documents/{name}/chunks/{index}", mime_type="application/octet-stream")
+async def read_document_chunk(name: str, index: int) -> bytes:
+    """Read one fixed-size chunk of a document; the chunk size and count are in its info."""
+    content, _ = await anyio.to_thread.run_sync(documents.read_chunk, unquote(name), index)
+    return content
+
+
+@mcp.resource("file://documents/{name}/range/{offset}/{length}", mime_type="application/octet-stream")
+async def read_document_range(name: str, offset: int, length: int) -> bytes:
+    """Read `length` bytes (at most DOCUMENT_MAX_READ_BYTES) of a document starting at byte `offset`."""
+    content, _ = await anyio.to_thread.run_sync(documents.read_range, unquote(name), offset, length)
+    return content
+
+
+# List the registered resources plus the document directory, one page at a time.
+# Replaces FastMCP's handler, which only knows about resources registered up front.
+async def list_resources(request: types.ListResourcesRequest) -> types.ListResourcesResult:
+    cursor = request.params.cursor if request.params else None
+    if not mcp.settings.stateless_http:
+        # Sessions that listed resources are told when the list changes
+        list_watchers.add(current_session())
+        start_watcher()
+    registered = await mcp.list_resources()
+    resources = [] if cursor else registered
+    uris = {str(resource.uri) for resource in registered}
+
+    infos, next_cursor = await anyio.to_thread.run_sync(documents.page, cursor, DOCUMENT_PAGE_SIZE)
+    for info in infos:
+        if info["uri"] in uris:
+            continue
+        resources.append(types.Resource(
+            uri=info["uri"],
+            name=info["name"],
+            mimeType=info["mime_type"],
+            size=info["size"],
+            _meta={"etag": info["etag"], "mtime": info["mtime"]},
+        ))
+    return types.ListResourcesResult(resources=resources, nextCursor=next_cursor)
+
+
+mcp._mcp_server.list_resources()(list_resources)
+
+
+# Resource subscriptions, so clients keep a copy and re-read only what changed. A watcher
+# polls the directory's mtime and the subscribed documents every DOCUMENT_WATCH_INTERVAL
+# seconds, sends resources/updated to the subscribers of a changed document (and of its
+# info, chunk and range URIs) and resources/list_changed to the sessions that listed
+# resources. Pushing needs a stateful session, so stateless mode does not offer any of it.
+DOCUMENT_WATCH_INTERVAL = float(os.getenv("DOCUMENT_WATCH_INTERVAL", "1.0"))
+subscriptions = {}  # uri -> sessions subscribed to it
+list_watchers = weakref.WeakSet()
+watched_etags = {}  # document name -> ETag last seen, None once the document is gone
+watcher = None
+
+
+def current_session():
+    # Session of the request being handled. FastMCP's Context is meant for its own tool
+    # and resource functions; the lowlevel handlers below read the lowlevel server's
+    # request context instead (mcp SDK 1.30)
+    return mcp._mcp_server.request_context.session
+
+
+def document_name(uri):
+    # file://documents/{name}[/...] -> name; None for any other resource
+    if not uri.startswith(URI_PREFIX):
+        return None
+    return unquote(uri[len(URI_PREFIX):].split("/", 1)[0]) or None
+
+
+async def notify(sessions, send):
+    for session in list(sessions):
+        try:
+            await send(session)
+        except Exception:
+            # The client went away
+            sessions.discard(session)
+
+
+async def watch_documents():
+    names = await anyio.to_thread.run_sync(documents.names)
+    while True:
+        await anyio.sleep(DOCUMENT_WATCH_INTERVAL)
+
+        # names() returns the same list until the directory is rescanned
+        current = await anyio.to_thread.run_sync(documents.names)
+        if current is not names and current != names:
+            await notify(list_watchers, lambda session: session.send_resource_list_changed())
+        names = current
+
+        for uri in [uri for uri, sessions in subscriptions.items() if not sessions]:
+            del subscriptions[uri]
+        watched = {document_name(uri) for uri in subscriptions} - {None}
+        for name in set(watched_etags) - watched:
+            del watched_etags[name]
+        latest = await anyio.to_thread.run_sync(documents.etags, watched)
+        changed = {name for name, etag in latest.items() if etag != watched_etags.get(name)}
+        watched_etags.update(latest)
+        for uri, sessions in list(subscriptions.items()):
+            if document_name(uri) in changed:
+                await notify(sessions, lambda session: session.send_resource_updated(uri))
+
+
+def start_watcher():
+    global watcher
+    if watcher is None or watcher.done():
+        watcher = asyncio.get_running_loop().create_task(watch_documents())
+
+
+async def stop_watcher():
+    global watcher
+    if watcher is not None:
+        watcher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await watcher
+        watcher = None
+
+
+@mcp._mcp_server.subscribe_resource()
+async def subscribe_resource(uri) -> None:
+    if mcp.settings.stateless_http:
+        raise ValueError("Subscriptions need a stateful session (MCP_STATELESS_HTTP=false)")
+    uri = str(uri)
+    subscriptions.setdefault(uri, weakref.WeakSet()).add(current_session())
+    name = document_name(uri)
+    if name is not None and name not in watched_etags:
+        # Changes made from now on are reported, even before the watcher's next tick
+        watched_etags.update(await anyio.to_thread.run_sync(documents.etags, [name]))
+    start_watcher()
+
+
+@mcp._mcp_server.unsubscribe_resource()
+async def unsubscribe_resource(uri) -> None:
+    sessions = subscriptions.get(str(uri))
+    if sessions is not None:
+        sessions.discard(current_session())
+
+
+def advertise_resource_notifications(server):
+    # mcp SDK 1.30 has no setting for this: Server.get_capabilities always reports
+    # resources.subscribe=false, and the HTTP session manager builds the initialization
+    # options without NotificationOptions, so listChanged is false too. Override both
+    # here, and nowhere else, while the transport can push notifications; drop this once
+    # the SDK takes them as options.
+    base_capabilities = server.get_capabilities
+
+    def get_capabilities(notification_options, experimental_capabilities):
+        capabilities = base_capabilities(notification_options, experimental_capabilities)
+        if capabilities.resources is not None and not mcp.settings.stateless_http:
+            capabilities.resources.subscribe = True
+            capabilities.resources.listChanged = True
+        return capabilities
+
+    server.get_capabilities = get_capabilities
+
+
+advertise_resource_notifications(mcp._mcp_server)
 
 
 # Add a prompt for code review
@@ -35,8 +223,77 @@ def review_code(code: str) -> str:
 
 
 
+def http_settings():
+    # Shared by the parent process and every worker, so they agree on the mode.
+    # Several workers share one socket and any of them may take any request, which
+    # only works without per-session server state (stateless streamable-HTTP).
+    workers = int(os.getenv("MCP_WORKERS", "1"))
+    stateless = os.getenv("MCP_STATELESS_HTTP", "true" if workers > 1 else "false").lower() in ("1", "true", "yes")
+    json_response = os.getenv("MCP_JSON_RESPONSE", "false").lower() in ("1", "true", "yes")
+    return workers, stateless, json_response
+
+
+def create_app():
+    # Called once per worker process
+    _, stateless, json_response = http_settings()
+    mcp.settings.stateless_http = stateless
+    mcp.settings.json_response = json_response
+    app = mcp.streamable_http_app()
+
+    # The document watcher is started by the first subscription or listing and stopped
+    # with the app, inside the session manager's lifespan
+    session_lifespan = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with session_lifespan(app):
+            try:
+                yield
+            finally:
+                await stop_watcher()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def serve():
+    transport = os.getenv("MCP_TRANSPORT", "streamable-http")
+    if transport != "streamable-http":
+        mcp.run(transport=transport)
+        return
+
+    workers, stateless, _ = http_settings()
+    if workers > 1 and not stateless:
+        raise RuntimeError(
+            "MCP_WORKERS > 1 needs MCP_STATELESS_HTTP=true; for stateful sessions run one worker "
+            "per port behind a proxy that routes on the Mcp-Session-Id header"
+        )
+    if stateless:
+        # No session outlives a request, so there is nobody to push notifications to
+        print(
+            "Stateless HTTP: tools/list_changed and resource update notifications are not sent; "
+            "hosts keep their cached tool catalog until they reconnect"
+        )
+    limit = os.getenv("MCP_LIMIT_CONCURRENCY")
+
+    import uvicorn
+    uvicorn.run(
+        # Workers import the app factory themselves; a single process uses it directly
+        "server:create_app" if workers > 1 else create_app,
+        factory=True,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        workers=workers,
+        limit_concurrency=int(limit) if limit else None,
+        backlog=int(os.getenv("MCP_BACKLOG", "2048")),
+        timeout_keep_alive=int(os.getenv("MCP_KEEPALIVE_TIMEOUT", "5")),
+        timeout_graceful_shutdown=int(os.getenv("MCP_GRACEFUL_SHUTDOWN", "30")),
+        log_level=mcp.settings.log_level.lower(),
+    )
+
+
 if __name__ == "__main__":
-    import os
     transport = os.getenv("MCP_TRANSPORT", "streamable-http")
-    print(f"Starting MCP server ({transport}) on 0.0.0.0:8080")
-    mcp.run(transport=transport)
+    print(f"Starting MCP server ({transport}) on {mcp.settings.host}:{mcp.settings.port}")
+    serve()
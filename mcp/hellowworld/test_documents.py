@@ -0,0 +1,37 @@
+import pytest
+
+from documents import DocumentStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    (tmp_path / "big.bin").write_bytes(bytes(range(256)) * 64)
+    return DocumentStore(tmp_path, chunk_bytes=1024, max_read_bytes=4096, cache_size=2)
+
+
+def test_read_range(store):
+    content, info = store.read_range("big.bin", 100, 50)
+    assert content == (bytes(range(256)) * 64)[100:150]
+    assert info["size"] == 16384
+
+
+def test_read_range_stops_at_end_of_file(store):
+    content, _ = store.read_range("big.bin", 16000, 4096)
+    assert len(content) == 384
+
+
+def test_read_range_rejects_lengths_over_the_read_limit(store):
+    with pytest.raises(ValueError, match="read limit"):
+        store.read_range("big.bin", 0, 4097)
+
+
+def test_read_range_rejects_offsets_past_the_end(store):
+    with pytest.raises(ValueError):
+        store.read_range("big.bin", 16385, 1)
+
+
+def test_read_document_refuses_files_over_the_read_limit(store):
+    with pytest.raises(ValueError, match="chunks"):
+        store.read_document("big.bin")
+    content, _ = store.read_chunk("big.bin", 15)
+    assert len(content) == 1024
@@ -0,0 +1,211 @@
+# In-memory city index behind the weather tools, built once at start-up.
+# Cities come from CITY_DATA_PATH, a GeoNames dump (cities500.txt, cities15000.txt, ...:
+# tab-separated, alternate names comma-separated in the fourth column), or from the
+# small built-in list below when no dump is configured.
+#
+# Lookup order for a query:
+#   1. exact match on a normalized name or alias (case, accents and punctuation ignored),
+#   2. prefix match ("san fran" -> San Francisco), most populous city first, trying
+#      primary names before aliases so "new" is New York rather than Delhi ("New Delhi"),
+#   3. fuzzy match on character trigrams, for misspellings ("Chicgo" -> Chicago), also
+#      against the start of longer names.
+# A trailing qualifier ("Paris, France", "Austin, TX") is dropped when the whole query
+# does not match; a two-letter country code as qualifier picks that country's city.
+# Names and aliases are kept in one sorted list so prefix lookups are a binary search;
+# only primary and ASCII names go into the trigram index, which keeps it compact.
+
+import bisect
+import string
+import difflib
+import unicodedata
+from array import array
+from functools import lru_cache
+
+# name, country code, population, aliases
+BUILTIN_CITIES = [
+    ("New York", "US", 8804190, ["New York City", "NYC", "NY"]),
+    ("Los Angeles", "US", 3898747, ["LA", "L.A."]),
+    ("Chicago", "US", 2746388, ["Chi-Town"]),
+    ("Houston", "US", 2304580, []),
+    ("Phoenix", "US", 1608139, []),
+    ("San Francisco", "US", 873965, ["SF", "San Fran"]),
+    ("Seattle", "US", 737015, []),
+    ("Boston", "US", 675647, []),
+    ("Washington", "US", 689545, ["Washington DC", "Washington D.C.", "DC"]),
+    ("Toronto", "CA", 2794356, []),
+    ("Mexico City", "MX", 9209944, ["Ciudad de México", "CDMX"]),
+    ("São Paulo", "BR", 12325232, ["Sao Paulo"]),
+    ("London", "GB", 8982000, []),
+    ("Paris", "FR", 2161000, []),
+    ("Berlin", "DE", 3645000, []),
+    ("Madrid", "ES", 3223000, []),
+    ("Rome", "IT", 2873000, ["Roma"]),
+    ("Munich", "DE", 1488000, ["München", "Muenchen"]),
+    ("Moscow", "RU", 12506000, ["Moskva"]),
+    ("Cairo", "EG", 9540000, ["Al Qahirah"]),
+    ("Lagos", "NG", 15388000, []),
+    ("Mumbai", "IN", 12442373, ["Bombay"]),
+    ("Delhi", "IN", 11034555, ["New Delhi"]),
+    ("Beijing", "CN", 21540000, ["Peking"]),
+    ("Shanghai", "CN", 24870000, []),
+    ("Tokyo", "JP", 13960000, []),
+    ("Seoul", "KR", 9776000, []),
+    ("Singapore", "SG", 5686000, []),
+    ("Sydney", "AU", 5312000, []),
+    ("Buenos Aires", "AR", 3075646, []),
+]
+
+FUZZY_MIN_SCORE = 0.75
+FUZZY_CANDIDATES = 50
+_PUNCTUATION = str.maketrans({ch: " " for ch in string.punctuation})
+
+
+def normalize(text):
+    # "  São-Paulo " -> "sao paulo"; most names are ASCII and skip the Unicode pass
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(" " if not ch.isalnum() else ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.translate(_PUNCTUATION).casefold().split())
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CityIndex:
+    def __init__(self, cities):
+        self.names = []
+        self.countries = []
+        self.populations = array("q")
+        keys = {}  # normalized name or alias -> city ids
+        primary = {}  # normalized primary name -> city ids
+        fuzzy_keys = set()
+        for name, country, population, aliases in cities:
+            city = len(self.names)
+            self.names.append(name)
+            self.countries.append(country)
+            self.populations.append(population)
+            for position, alias in enumerate([name, *aliases]):
+                key = normalize(alias)
+                if not key:
+                    continue
+                keys.setdefault(key, []).append(city)
+                if position == 0:
+                    primary.setdefault(key, []).append(city)
+                # The primary name and its ASCII form (GeoNames lists it first) are enough
+                # to catch misspellings; the other aliases only match exactly or by prefix
+                if position < 2:
+                    fuzzy_keys.add(key)
+
+        # Most populous city first for names shared by several cities
+        self.keys, self.key_cities = self._sorted_keys(keys)
+        self.primary_keys, self.primary_cities = self._sorted_keys(primary)
+        # Cached per index: an lru_cache on the method would keep every index alive
+        self.lookup = lru_cache(maxsize=4096)(self._lookup)
+        self.grams = {}
+        for key_id, key in enumerate(self.keys):
+            if key in fuzzy_keys:
+                for gram in trigrams(key):
+                    self.grams.setdefault(gram, array("I")).append(key_id)
+
+    def _sorted_keys(self, keys):
+        ordered = sorted(keys)
+        return ordered, [
+            array("I", sorted(set(keys[key]), key=lambda city: -self.populations[city])) for key in ordered
+        ]
+
+    def __len__(self):
+        return len(self.names)
+
+    def _prefer(self, cities, country):
+        # Most populous of the cities, from the given country when any of them is
+        if country:
+            cities = [city for city in cities if self.countries[city] == country] or cities
+        return max(cities, key=lambda city: self.populations[city]) if cities else None
+
+    def _exact(self, key, country=None):
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return self._prefer(self.key_cities[position], country)
+        return None
+
+    def _prefix(self, key, country=None):
+        for keys, key_cities in ((self.primary_keys, self.primary_cities), (self.keys, self.key_cities)):
+            start = bisect.bisect_left(keys, key)
+            end = bisect.bisect_left(keys, key + "\U0010ffff")
+            # Each key's cities are sorted by population, so only the first one counts
+            # unless a country has to be matched
+            cities = [city for key_id in range(start, end) for city in key_cities[key_id][:None if country else 1]]
+            if cities:
+                return self._prefer(cities, country)
+        return None
+
+    def _fuzzy(self, key, country=None):
+        shared = {}
+        for gram in trigrams(key):
+            for key_id in self.grams.get(gram, ()):
+                shared[key_id] = shared.get(key_id, 0) + 1
+        best, best_rank = None, None
+        for key_id in sorted(shared, key=shared.get, reverse=True)[:FUZZY_CANDIDATES]:
+            # Scored against the whole name and against its start, so a misspelled
+            # "new yrok" still finds "new york city"
+            candidate = self.keys[key_id]
+            score = max(difflib.SequenceMatcher(None, key, candidate).ratio(),
+                        difflib.SequenceMatcher(None, key, candidate[:len(key)]).ratio())
+            if score <= FUZZY_MIN_SCORE:
+                continue
+            # A city in the requested country beats a closer match elsewhere
+            city = self._prefer(self.key_cities[key_id], country)
+            rank = (self.countries[city] == country, score, self.populations[city])
+            if best_rank is None or rank > best_rank:
+                best, best_rank = city, rank
+        return best
+
+    def _lookup(self, query):
+        # Returns (city id, "exact" | "prefix" | "fuzzy"), or None
+        key = normalize(query)
+        if not key:
+            return None
+        city = self._exact(key)
+        if city is not None:
+            return city, "exact"
+        name, comma, qualifier = query.rpartition(",")
+        if comma and normalize(name):
+            qualifier = normalize(qualifier).upper()
+            return self._match(normalize(name), qualifier if len(qualifier) == 2 else None)
+        return self._match(key)
+
+    def _match(self, key, country=None):
+        city = self._exact(key, country)
+        if city is not None:
+            return city, "exact"
+        # Very short prefixes match too much to be useful
+        if len(key) >= 3:
+            city = self._prefix(key, country)
+            if city is not None:
+                return city, "prefix"
+        city = self._fuzzy(key, country)
+        if city is not None:
+            return city, "fuzzy"
+        return None
+
+    def describe(self, city):
+        return f"{self.names[city]}, {self.countries[city]}"
+
+
+def read_geonames(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 15:
+                continue
+            name, ascii_name, alternate_names = fields[1], fields[2], fields[3]
+            aliases = [ascii_name] + [alias for alias in alternate_names.split(",") if alias]
+            yield name, fields[8], int(fields[14] or 0), aliases
+
+
+def load_city_index(path=None):
+    if path:
+        return CityIndex(read_geonames(path))
+    return CityIndex(BUILTIN_CITIES)
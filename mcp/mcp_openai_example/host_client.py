@@ -1,12 +1,17 @@
 import os
 import json
 import asyncio
+import time
+import hashlib
 import logging
-from typing import Any, Dict, List
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
+import httpx
 from dotenv import load_dotenv
-from openai import AzureOpenAI
-from mcp import ClientSession
+from openai import AsyncAzureOpenAI
+from mcp import ClientSession, types
 from mcp.client.streamable_http import streamablehttp_client
 
 # ─── Configuration / Logging Setup ────────────────────────────────────
@@ -16,9 +21,58 @@ load_dotenv(".env")
 SERVER_ENDPOINT = os.getenv("MCP_SERVER_URL", "http://127.0.0.1:8080/mcp")
 HEADERS: Dict[str, str] = {}
 
+
+def parse_server_list(value: str) -> Dict[str, str]:
+    # MCP_SERVERS="weather=http://127.0.0.1:8080/mcp,hello=http://127.0.0.1:8081/mcp"
+    servers: Dict[str, str] = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, url = item.partition("=")
+        if not sep or not name.strip() or not url.strip():
+            raise RuntimeError(f"Invalid MCP_SERVERS entry '{item}', expected name=url")
+        servers[name.strip()] = url.strip()
+    return servers or {"default": SERVER_ENDPOINT}
+
+
+MCP_SERVERS = parse_server_list(os.getenv("MCP_SERVERS", ""))
+
 AZURE_ENDPOINT = os.getenv("AZURE_OPENAI_API_ENDPOINT")
 AZURE_DEPLOYMENT = os.getenv("MODEL_DEPLOYMENT_NAME", "gpt-4.1")
 AZURE_API_KEY = os.getenv("AZURE_OPENAI_API_KEY", "")
+AZURE_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2025-01-01-preview")
+
+# Connection pool shared by every completion issued from this process.
+AZURE_MAX_CONNECTIONS = int(os.getenv("AZURE_OPENAI_MAX_CONNECTIONS", "100"))
+AZURE_MAX_KEEPALIVE = int(os.getenv("AZURE_OPENAI_MAX_KEEPALIVE", "20"))
+AZURE_KEEPALIVE_EXPIRY = float(os.getenv("AZURE_OPENAI_KEEPALIVE_EXPIRY", "60"))
+AZURE_TIMEOUT = float(os.getenv("AZURE_OPENAI_TIMEOUT", "60"))
+
+# Tool calls emitted in one assistant turn are dispatched concurrently unless
+# MCP_PARALLEL_TOOL_CALLS is turned off; the cap and timeout apply per turn/call.
+PARALLEL_TOOL_CALLS = os.getenv("MCP_PARALLEL_TOOL_CALLS", "true").lower() in ("1", "true", "yes")
+TOOL_CONCURRENCY = int(os.getenv("MCP_TOOL_CONCURRENCY", "8"))
+TOOL_TIMEOUT = float(os.getenv("MCP_TOOL_TIMEOUT", "30"))
+
+# Bounds of the tool loop in answer(): once either is spent the model is asked
+# to answer with what it has (tool_choice="none").
+MAX_TOOL_ITERATIONS = int(os.getenv("MCP_MAX_TOOL_ITERATIONS", "5"))
+TOOL_LOOP_BUDGET = float(os.getenv("MCP_TOOL_LOOP_BUDGET", "120"))
+
+# Deterministic tools whose results may be reused, as tool=ttl_seconds pairs; a
+# server/tool=ttl_seconds pair (server as named in MCP_SERVERS) applies to one server
+# only and wins over the plain tool name. Tools not listed here are never cached.
+TOOL_CACHE_TTLS = os.getenv("MCP_TOOL_CACHE_TTLS", "get_weather=300,get_weather_batch=300,add=86400")
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("MCP_TOOL_CACHE_MAX_ENTRIES", "1024"))
+TOOL_CACHE_MAX_BYTES = int(os.getenv("MCP_TOOL_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# Per-call prompt budget for conversation histories: the most recent messages are
+# always sent verbatim, older tool results are cut to an excerpt, and the oldest
+# turns are left out once the budget is exceeded.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("MCP_CONTEXT_TOKEN_BUDGET", "16000"))
+CONTEXT_KEEP_RECENT = int(os.getenv("MCP_CONTEXT_KEEP_RECENT", "8"))
+CONTEXT_SUMMARY_CHARS = int(os.getenv("MCP_CONTEXT_SUMMARY_CHARS", "300"))
 
 if not AZURE_API_KEY:
     raise RuntimeError("Missing AZURE_OPENAI_API_KEY in environment")
@@ -38,11 +92,21 @@ class AppLoggerAdapter(logging.LoggerAdapter):
 
 app_logger = AppLoggerAdapter(logger, {})
 
-# Initialize Azure OpenAI client
-azure_client = AzureOpenAI(
+# Initialize the async Azure OpenAI client on top of a shared keep-alive pool,
+# so completions never block the event loop (and the MCP session with it)
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=AZURE_MAX_CONNECTIONS,
+        max_keepalive_connections=AZURE_MAX_KEEPALIVE,
+        keepalive_expiry=AZURE_KEEPALIVE_EXPIRY,
+    ),
+    timeout=httpx.Timeout(AZURE_TIMEOUT, connect=10.0),
+)
+azure_client = AsyncAzureOpenAI(
     azure_endpoint=AZURE_ENDPOINT,
     api_key=AZURE_API_KEY,
-    api_version="2025-01-01-preview",
+    api_version=AZURE_API_VERSION,
+    http_client=http_client,
 )
 
 BASE_PROMPT = [
@@ -50,6 +114,55 @@ BASE_PROMPT = [
     {"role": "user", "content": "what is the weather in New York?"},
 ]
 
+def root_cause(error: BaseException) -> BaseException:
+    # Transport failures surface wrapped in (nested) anyio exception groups
+    while isinstance(error, BaseExceptionGroup) and error.exceptions:
+        error = error.exceptions[0]
+    return error
+
+
+class ServerConnection:
+    """One MCP session held open by its own task, so a failing server cannot tear down the others."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self.session: Optional[ClientSession] = None
+        self.error: Optional[BaseException] = None
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def open(self) -> ClientSession:
+        self._task = asyncio.create_task(self._hold())
+        await self._ready.wait()
+        if self.session is None:
+            raise RuntimeError(f"Failed to initialize MCP session '{self.name}': {self.error}")
+        return self.session
+
+    async def close(self):
+        self._closing.set()
+        if self._task:
+            await self._task
+
+    async def _hold(self):
+        try:
+            async with streamablehttp_client(url=self.url, headers=HEADERS) as (read_stream, write_stream, _):
+                handler = tool_catalog.message_handler(self.url)
+                async with ClientSession(read_stream, write_stream, message_handler=handler) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            self.error = root_cause(e)
+            if self.session is not None:
+                logger.error("MCP session '%s' dropped: %s", self.name, self.error)
+        finally:
+            self.session = None
+            self._ready.set()
+
+
 async def convert_mcp_tools_to_openai(tools_obj: Any) -> List[Dict[str, Any]]:
     result = []
     for tool in getattr(tools_obj, "tools", []):
@@ -64,87 +177,502 @@ async def convert_mcp_tools_to_openai(tools_obj: Any) -> List[Dict[str, Any]]:
     return result
 
 
-async def run():
-    app_logger.info("Starting MCP + OpenAI integration run")
+@dataclass
+class ToolCatalogEntry:
+    schema_hash: str
+    tools: List[Dict[str, Any]]
+    serialized: str
+
+
+class ToolCatalogCache:
+    """Converted OpenAI tool payloads per MCP server, keyed by schema hash.
 
-    async with streamablehttp_client(url=SERVER_ENDPOINT, headers=HEADERS) as (read_stream, write_stream, _):
-        async with ClientSession(read_stream, write_stream) as session:
-            try:
-                await session.initialize()
-                app_logger.info("MCP session initialized")
-            except Exception as e:
-                logger.error("Failed to initialize MCP session: %s", e)
-                return
+    A server's entry is only dropped when it sends tools/list_changed (or its
+    session is re-established); identical schemas share one payload object, so
+    the tool block sent to the model stays byte-identical between requests.
+    """
 
-            try:
+    def __init__(self):
+        self._current: Dict[str, str] = {}
+        self._entries: Dict[str, ToolCatalogEntry] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def invalidate(self, server: str):
+        self._release(self._current.pop(server, None))
+
+    def _release(self, schema_hash: Optional[str]):
+        # Payloads no server uses any more are dropped, so schema changes do not pile up
+        if schema_hash and schema_hash not in self._current.values():
+            self._entries.pop(schema_hash, None)
+
+    def schema_hash(self, server: str) -> Optional[str]:
+        return self._current.get(server)
+
+    def message_handler(self, server: str):
+        async def handle(message: Any) -> None:
+            if isinstance(message, types.ServerNotification) and isinstance(message.root, types.ToolListChangedNotification):
+                app_logger.info("Tool list changed on %s, invalidating cached catalog", server)
+                self.invalidate(server)
+        return handle
+
+    async def get(self, server: str, session: ClientSession) -> List[Dict[str, Any]]:
+        schema_hash = self._current.get(server)
+        if schema_hash:
+            return self._entries[schema_hash].tools
+
+        async with self._locks.setdefault(server, asyncio.Lock()):
+            schema_hash = self._current.get(server)
+            if not schema_hash:
                 tools_obj = await session.list_tools()
                 app_logger.info("Listed MCP tools: %s", tools_obj)
-            except Exception as e:
-                logger.error("Failed to list MCP tools: %s", e)
-                return
-
-            # Convert MCP tools to OpenAI format
-            openai_tools = await convert_mcp_tools_to_openai(tools_obj)
-            app_logger.info("Converted tools to OpenAI format: %s", openai_tools)
-
-            messages = list(BASE_PROMPT)
-
-            app_logger.info("Calling OpenAI with tool_choice=auto …")
-            try:
-                completion = azure_client.chat.completions.create(
-                model=AZURE_DEPLOYMENT,
-                messages=messages,
-                tools=openai_tools,
-                tool_choice="auto",
-            )
-            except Exception as e:
-                logger.error("OpenAI call failed: %s", e)
-                return
-
-            assistant_msg = completion.choices[0].message
-            app_logger.info("Received assistant message: %s", assistant_msg)
-
-            messages.append(assistant_msg)
-
-            if assistant_msg.tool_calls:
-                for call in assistant_msg.tool_calls:
-                    fname = call.function.name
-                    raw_args = call.function.arguments
-                    try:
-                        args = json.loads(raw_args)
-                    except json.JSONDecodeError:
-                        logger.error("Invalid JSON in tool arguments: %s", raw_args)
-                        continue
-
-                    app_logger.info("Invoking MCP tool '%s' with args: %s", fname, args)
-                    try:
-                        tool_result = await session.call_tool(fname,arguments=args)
-                        app_logger.info("Result from tool '%s': %s", fname, tool_result)
-                    except Exception as e:
-                        logger.error("Tool call %s failed: %s", fname, e)
-                        continue
-
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": call.id,
-                        "content": tool_result.content[0].text
-                    })
-
-                app_logger.info("Messages after processing tool calls: %s", messages)
-
-                app_logger.info("Calling OpenAI final completion")
-                try:
-                    final_completion = azure_client.chat.completions.create(
-                    model=AZURE_DEPLOYMENT,
-                    messages=messages,
-                    tools=openai_tools,
-                    tool_choice="auto",
-                )
-                    final_msg = final_completion.choices[0].message
-                    app_logger.info("Final assistant reply: %s", final_msg.content)
-                except Exception as e:
-                    logger.error("Final OpenAI call failed: %s", e)
+                openai_tools = await convert_mcp_tools_to_openai(tools_obj)
+                openai_tools.sort(key=lambda tool: tool["function"]["name"])
+                serialized = json.dumps(openai_tools, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+                schema_hash = hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+                if schema_hash not in self._entries:
+                    # Rebuilt from the canonical JSON so key order never depends on the server
+                    self._entries[schema_hash] = ToolCatalogEntry(schema_hash, json.loads(serialized), serialized)
+                self._current[server] = schema_hash
+                app_logger.info("Cached %d tool(s) for %s (schema %s)", len(openai_tools), server, schema_hash[:12])
+        return self._entries[schema_hash].tools
+
+
+tool_catalog = ToolCatalogCache()
+
+
+def parse_ttl_list(value: str) -> Dict[str, float]:
+    ttls: Dict[str, float] = {}
+    for item in value.split(","):
+        name, sep, ttl = item.strip().partition("=")
+        if sep and name.strip():
+            ttls[name.strip()] = float(ttl)
+    return ttls
+
+
+class ToolResultCache:
+    """LRU cache of deterministic tool results, keyed by server, tool and canonical JSON arguments.
+
+    Bounded both by entry count and by the approximate size of the cached
+    text; expired entries are dropped lazily on lookup. Identical calls made
+    while one is in flight (e.g. parallel tool calls in one turn) share it.
+    """
+
+    def __init__(self, ttls: Dict[str, float], max_entries: int, max_bytes: int):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+
+    def ttl(self, server: str, tool: str) -> Optional[float]:
+        return self.ttls.get(f"{server}/{tool}", self.ttls.get(tool))
+
+    @staticmethod
+    def key(server: str, tool: str, arguments: Dict[str, Any]) -> str:
+        return json.dumps([server, tool, arguments], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    async def get_or_call(self, name: str, key: str, ttl: float, call: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            app_logger.info("Sharing in-flight call to '%s'", name)
+            self.shared += 1
+            return await asyncio.shield(task)
+        cached = self.get(key)
+        if cached is not None:
+            app_logger.info("Tool cache hit for '%s'", name)
+            return cached
+        # The call runs as its own task, so a cancelled caller does not cancel it for the
+        # callers sharing it
+        task = asyncio.ensure_future(self._call(key, ttl, call))
+        self._inflight[key] = task
+        task.add_done_callback(lambda task: self._finished(key, task))
+        return await asyncio.shield(task)
+
+    async def _call(self, key: str, ttl: float, call: Callable[[], Awaitable[Any]]) -> Any:
+        result = await call()
+        if not result.isError:
+            size = sum(len(getattr(item, "text", "") or "") for item in result.content)
+            self.put(key, ttl, result, size)
+        return result
+
+    def _finished(self, key: str, task: "asyncio.Task[Any]"):
+        del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when nobody was left waiting on it
+            task.exception()
+
+    def put(self, key: str, ttl: float, value: Any, size: int):
+        size += len(key)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+tool_results = ToolResultCache(parse_ttl_list(TOOL_CACHE_TTLS), TOOL_CACHE_MAX_ENTRIES, TOOL_CACHE_MAX_BYTES)
+
+
+# Merged catalogs keyed by the (server, schema hash) pairs they were built from; only the
+# most recently used combinations are kept, older ones refer to superseded schemas
+MERGED_CATALOG_LIMIT = 32
+_merged_catalogs: "OrderedDict[Tuple[Tuple[str, str], ...], Tuple[List[Dict[str, Any]], Dict[str, Tuple[str, str]]]]" = OrderedDict()
+
+
+def merge_tool_catalogs(catalogs: Dict[str, List[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], Dict[str, Tuple[str, str]]]:
+    """Merge per-server catalogs into one tool list plus an exposed name -> (server, tool) index.
+
+    Names offered by more than one server are exposed as `<server>__<tool>`.
+    """
+    owners: Dict[str, int] = {}
+    for tools in catalogs.values():
+        for tool in tools:
+            owners[tool["function"]["name"]] = owners.get(tool["function"]["name"], 0) + 1
+
+    merged: List[Dict[str, Any]] = []
+    routes: Dict[str, Tuple[str, str]] = {}
+    for server in sorted(catalogs):
+        for tool in catalogs[server]:
+            name = tool["function"]["name"]
+            if owners[name] > 1:
+                exposed = f"{server}__{name}"
+                app_logger.info("Tool name '%s' is offered by several servers, exposing it as '%s'", name, exposed)
+                tool = {**tool, "function": {**tool["function"], "name": exposed}}
+            routes[tool["function"]["name"]] = (server, name)
+            merged.append(tool)
+    return merged, routes
+
+
+class ToolRouter:
+    """The sessions one conversation can use, with an O(1) index from tool name to owning session."""
+
+    def __init__(self):
+        self.sessions: Dict[str, ClientSession] = {}
+        self.urls: Dict[str, str] = {}
+        self.tools: List[Dict[str, Any]] = []
+        self.routes: Dict[str, Tuple[str, str]] = {}
+
+    def add(self, name: str, url: str, session: ClientSession):
+        self.sessions[name] = session
+        self.urls[name] = url
+
+    def remove(self, name: str):
+        self.sessions.pop(name, None)
+        self.urls.pop(name, None)
+
+    async def load(self):
+        # Catalogs of all servers are fetched (or read from the cache) in parallel
+        names = list(self.sessions)
+        results = await asyncio.gather(
+            *(tool_catalog.get(self.urls[name], self.sessions[name]) for name in names), return_exceptions=True
+        )
+        catalogs: Dict[str, List[Dict[str, Any]]] = {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                logger.error("Failed to list MCP tools on '%s': %s", name, result)
+                self.remove(name)
+            else:
+                catalogs[name] = result
+
+        key = tuple(sorted((name, tool_catalog.schema_hash(self.urls[name]) or "") for name in catalogs))
+        if key not in _merged_catalogs:
+            _merged_catalogs[key] = merge_tool_catalogs(catalogs)
+            while len(_merged_catalogs) > MERGED_CATALOG_LIMIT:
+                _merged_catalogs.popitem(last=False)
+        _merged_catalogs.move_to_end(key)
+        self.tools, self.routes = _merged_catalogs[key]
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        route = self.routes.get(name)
+        if route is None:
+            raise ValueError(f"Unknown tool: {name}")
+        server, tool_name = route
+        ttl = tool_results.ttl(server, tool_name)
+        if ttl is None:
+            return await self.sessions[server].call_tool(tool_name, arguments=arguments)
+
+        # Repeat lookups of deterministic tools never leave the process
+        key = tool_results.key(self.urls[server], tool_name, arguments)
+        session = self.sessions[server]
+        return await tool_results.get_or_call(name, key, ttl, lambda: session.call_tool(tool_name, arguments=arguments))
+
+
+async def invoke_tool_call(router: ToolRouter, call: Any, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    """Run one tool call and build its `role: tool` message; failures become the content."""
+    call_id = call["id"]
+    fname = call["function"]["name"]
+    raw_args = call["function"]["arguments"]
+    try:
+        args = json.loads(raw_args) if raw_args else {}
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in tool arguments: %s", raw_args)
+        return {"role": "tool", "tool_call_id": call_id, "content": f"Error: invalid JSON arguments for '{fname}'"}
+
+    async with semaphore:
+        app_logger.info("Invoking MCP tool '%s' with args: %s", fname, args)
+        try:
+            tool_result = await asyncio.wait_for(router.call_tool(fname, args), timeout=TOOL_TIMEOUT)
+            app_logger.info("Result from tool '%s': %s", fname, tool_result)
+        except asyncio.TimeoutError:
+            logger.error("Tool call %s timed out after %.1fs", fname, TOOL_TIMEOUT)
+            return {"role": "tool", "tool_call_id": call_id, "content": f"Error: tool '{fname}' timed out"}
+        except Exception as e:
+            logger.error("Tool call %s failed: %s", fname, e)
+            return {"role": "tool", "tool_call_id": call_id, "content": f"Error: tool '{fname}' failed: {e}"}
+
+    content = "\n".join(item.text for item in tool_result.content if getattr(item, "type", None) == "text")
+    if tool_result.isError:
+        content = f"Error: {content}"
+    return {"role": "tool", "tool_call_id": call_id, "content": content}
+
+
+async def dispatch_tool_calls(router: ToolRouter, tool_calls: List[Any]) -> List[Dict[str, Any]]:
+    """Resolve the tool calls of one assistant turn, keeping the order of `tool_calls`."""
+    if PARALLEL_TOOL_CALLS:
+        semaphore = asyncio.Semaphore(max(1, TOOL_CONCURRENCY))
+        return list(await asyncio.gather(*(invoke_tool_call(router, call, semaphore) for call in tool_calls)))
+
+    semaphore = asyncio.Semaphore(1)
+    return [await invoke_tool_call(router, call, semaphore) for call in tool_calls]
+
+
+# ─── Context Budget ───────────────────────────────────────────────────
+
+def count_tokens(text: str) -> int:
+    # The window only has to stay roughly under budget, so ~4 characters per token will do
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    tokens = 4 + count_tokens(message.get("content") or "")
+    if message.get("tool_calls"):
+        tokens += count_tokens(json.dumps(message["tool_calls"]))
+    return tokens
+
+
+class Conversation:
+    """Chat history whose token counts are tracked as messages are added.
+
+    The full history is kept; `window()` is the view sent to the model: system
+    messages, the latest user message and the last CONTEXT_KEEP_RECENT messages
+    verbatim, older tool results cut to an excerpt, and the oldest remaining
+    turns dropped while the view is over CONTEXT_TOKEN_BUDGET.
+    """
+
+    def __init__(self, messages: List[Dict[str, Any]] = (), budget: int = CONTEXT_TOKEN_BUDGET,
+                 keep_recent: int = CONTEXT_KEEP_RECENT, summary_chars: int = CONTEXT_SUMMARY_CHARS):
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.summary_chars = summary_chars
+        self.messages: List[Dict[str, Any]] = []
+        self.tokens: List[int] = []
+        self.extend(messages)
+
+    def append(self, message: Dict[str, Any]):
+        message = dict(message)
+        self.messages.append(message)
+        self.tokens.append(message_tokens(message))
+
+    def extend(self, messages: List[Dict[str, Any]]):
+        for message in messages:
+            self.append(message)
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __repr__(self) -> str:
+        return repr(self.messages)
+
+    def _compact(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        content = message.get("content") or ""
+        if message["role"] != "tool" or len(content) <= self.summary_chars:
+            return None
+        omitted = len(content) - self.summary_chars
+        return {**message, "content": f"{content[:self.summary_chars].rstrip()}… [{omitted} more characters omitted]"}
+
+    def window(self) -> List[Dict[str, Any]]:
+        recent_start = max(0, len(self.messages) - self.keep_recent)
+        last_user = max((i for i, m in enumerate(self.messages) if m["role"] == "user"), default=-1)
+
+        view: List[List[Any]] = []
+        for index, message in enumerate(self.messages):
+            tokens = self.tokens[index]
+            if index < recent_start:
+                compacted = self._compact(message)
+                if compacted is not None:
+                    message, tokens = compacted, message_tokens(compacted)
+            view.append([index, message, tokens])
+
+        # Oldest first; an assistant turn goes together with its tool results
+        total = sum(tokens for _, _, tokens in view)
+        position = 0
+        while total > self.budget and position < len(view) and view[position][0] < recent_start:
+            index, message, tokens = view[position]
+            if message["role"] == "system" or index == last_user:
+                position += 1
+                continue
+            total -= view.pop(position)[2]
+            if message.get("tool_calls"):
+                while position < len(view) and view[position][1]["role"] == "tool":
+                    total -= view.pop(position)[2]
+
+        app_logger.info("Context window: %d of %d message(s), ~%d tokens", len(view), len(self.messages), total)
+        return [message for _, message, _ in view]
+
+
+# ─── Conversation Loop ────────────────────────────────────────────────
+
+TokenCallback = Callable[[str], Awaitable[None]]
+
+
+async def stream_completion(messages: List[Any], openai_tools: List[Dict[str, Any]], tool_choice: str,
+                            on_token: Optional[TokenCallback] = None) -> Dict[str, Any]:
+    """Stream one completion, forwarding content deltas as they arrive, and rebuild the assistant message."""
+    stream = await azure_client.chat.completions.create(
+        model=AZURE_DEPLOYMENT,
+        messages=messages,
+        tools=openai_tools,
+        tool_choice=tool_choice,
+        stream=True,
+    )
+
+    content_parts: List[str] = []
+    tool_calls: Dict[int, Dict[str, Any]] = {}
+    async for chunk in stream:
+        # Azure sends content-filter chunks without choices
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content_parts.append(delta.content)
+            if on_token:
+                await on_token(delta.content)
+        for tc in delta.tool_calls or []:
+            entry = tool_calls.setdefault(tc.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+            if tc.id:
+                entry["id"] = tc.id
+            if tc.function and tc.function.name:
+                entry["function"]["name"] += tc.function.name
+            if tc.function and tc.function.arguments:
+                entry["function"]["arguments"] += tc.function.arguments
+
+    message: Dict[str, Any] = {"role": "assistant", "content": "".join(content_parts) or None}
+    if tool_calls:
+        message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+    return message
+
+
+async def answer(router: ToolRouter, messages: Conversation, on_token: Optional[TokenCallback] = None) -> Optional[str]:
+    """Answer one conversation over already initialized MCP sessions.
+
+    Tool calls are resolved until the model stops asking for them, or until
+    MAX_TOOL_ITERATIONS / TOOL_LOOP_BUDGET run out; every completion is
+    streamed, so the final answer reaches `on_token` as it is generated.
+    Each completion is sent the token-budgeted window of `messages`.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + TOOL_LOOP_BUDGET
+
+    for iteration in range(MAX_TOOL_ITERATIONS + 1):
+        exhausted = iteration == MAX_TOOL_ITERATIONS or loop.time() >= deadline
+        tool_choice = "none" if exhausted else "auto"
+        if exhausted:
+            app_logger.info("Tool loop budget spent after %d iteration(s), asking for a final answer", iteration)
+
+        app_logger.info("Calling OpenAI with tool_choice=%s (iteration %d) …", tool_choice, iteration)
+        try:
+            assistant_msg = await stream_completion(messages.window(), router.tools, tool_choice, on_token)
+        except Exception as e:
+            logger.error("OpenAI call failed: %s", e)
+            return None
+
+        app_logger.info("Received assistant message: %s", assistant_msg)
+        messages.append(assistant_msg)
+
+        if not assistant_msg.get("tool_calls"):
+            app_logger.info("Final assistant reply: %s", assistant_msg["content"])
+            return assistant_msg["content"]
+
+        app_logger.info("Dispatching %d tool call(s) (parallel=%s)", len(assistant_msg["tool_calls"]), PARALLEL_TOOL_CALLS)
+        messages.extend(await dispatch_tool_calls(router, assistant_msg["tool_calls"]))
+        app_logger.info("Messages after processing tool calls: %s", messages)
+
+    return None
+
+
+async def run():
+    app_logger.info("Starting MCP + OpenAI integration run")
+
+    connections = [ServerConnection(name, url) for name, url in MCP_SERVERS.items()]
+    try:
+        # Handshakes with all servers run in parallel; a server that fails is left out
+        results = await asyncio.gather(*(connection.open() for connection in connections), return_exceptions=True)
+        router = ToolRouter()
+        for connection, result in zip(connections, results):
+            if isinstance(result, BaseException):
+                logger.error("%s", result)
+            else:
+                app_logger.info("MCP session '%s' initialized", connection.name)
+                router.add(connection.name, connection.url, result)
+        if not router.sessions:
+            return
+
+        # Converted OpenAI-format tools, served from the catalog cache when warm
+        await router.load()
+        app_logger.info("Converted tools to OpenAI format: %s", router.tools)
+
+        async def print_token(token: str):
+            print(token, end="", flush=True)
+
+        await answer(router, Conversation(BASE_PROMPT), on_token=print_token)
+        print()
+        app_logger.info("Tool result cache: %s", tool_results.stats())
+    finally:
+        await asyncio.gather(*(connection.close() for connection in connections))
+
+
+async def main():
+    try:
+        await run()
+    finally:
+        await azure_client.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(run())
+    asyncio.run(main())
@@ -0,0 +1,353 @@
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import contextlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from host_client import (
+    BASE_PROMPT,
+    Conversation,
+    HEADERS,
+    MCP_SERVERS,
+    TokenCallback,
+    ToolRouter,
+    answer,
+    app_logger,
+    azure_client,
+    logger,
+    root_cause,
+    tool_catalog,
+    tool_results,
+)
+
+# ─── Service Configuration ────────────────────────────────────────────
+
+SERVICE_MODE = os.getenv("HOST_SERVICE_MODE", "http")  # "http" or "stdin"
+SERVICE_HOST = os.getenv("HOST_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("HOST_SERVICE_PORT", "8000"))
+MAX_CONVERSATIONS = int(os.getenv("HOST_MAX_CONVERSATIONS", "64"))
+# Histories are kept for follow-up turns until they have been idle this long, or until
+# more than HOST_MAX_STORED_CONVERSATIONS exist (least recently used go first)
+CONVERSATION_IDLE_TTL = float(os.getenv("HOST_CONVERSATION_IDLE_TTL", "3600"))
+MAX_STORED_CONVERSATIONS = int(os.getenv("HOST_MAX_STORED_CONVERSATIONS", "1000"))
+
+SESSION_POOL_SIZE = int(os.getenv("MCP_SESSION_POOL_SIZE", "2"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", "30"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("MCP_HEALTH_CHECK_TIMEOUT", "5"))
+ACQUIRE_TIMEOUT = float(os.getenv("MCP_ACQUIRE_TIMEOUT", "30"))
+RECONNECT_MAX_BACKOFF = float(os.getenv("MCP_RECONNECT_MAX_BACKOFF", "30"))
+
+
+# ─── MCP Session Pool ─────────────────────────────────────────────────
+
+class PooledSession:
+    """One warm MCP session, kept alive (and reconnected) by its own task.
+
+    The streamable-http transport and ClientSession are task-bound context
+    managers, so they are entered and exited inside `_maintain` only.
+    """
+
+    def __init__(self, pool: "MCPSessionPool", index: int):
+        self.pool = pool
+        self.index = index
+        self.session: Optional[ClientSession] = None
+        self.in_flight = 0
+        self.ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._maintain())
+
+    async def close(self):
+        self._closing.set()
+        if self._task:
+            await self._task
+
+    async def _maintain(self):
+        backoff = 1.0
+        reconnect = False
+        while not self._closing.is_set():
+            try:
+                async with streamablehttp_client(url=self.pool.url, headers=self.pool.headers) as (read_stream, write_stream, _):
+                    handler = tool_catalog.message_handler(self.pool.url)
+                    async with ClientSession(read_stream, write_stream, message_handler=handler) as session:
+                        await session.initialize()
+                        if reconnect:
+                            # The server may have restarted with other tools and no list_changed to tell us
+                            tool_catalog.invalidate(self.pool.url)
+                        # Tool discovery runs once per catalog version, not once per question
+                        await tool_catalog.get(self.pool.url, session)
+                        self.session = session
+                        self.ready.set()
+                        self.pool.notify_ready()
+                        backoff = 1.0
+                        app_logger.info("MCP session #%d connected to %s", self.index, self.pool.url)
+                        await self._health_loop(session)
+            except Exception as e:
+                logger.error("MCP session #%d to %s dropped: %s", self.index, self.pool.url, root_cause(e))
+            finally:
+                self.ready.clear()
+                self.session = None
+
+            if self._closing.is_set():
+                break
+            reconnect = True
+            app_logger.info("Reconnecting MCP session #%d in %.1fs", self.index, backoff)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._closing.wait(), timeout=backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_BACKOFF)
+
+    async def _health_loop(self, session: ClientSession):
+        # Returns on shutdown; raises (and so reconnects) when a ping fails
+        while True:
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=HEALTH_CHECK_INTERVAL)
+                return
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.wait_for(session.send_ping(), timeout=HEALTH_CHECK_TIMEOUT)
+
+
+class MCPSessionPool:
+    """A fixed set of initialized MCP sessions shared by all conversations."""
+
+    def __init__(self, url: str, headers: Dict[str, str], size: int):
+        self.url = url
+        self.headers = headers
+        self.members = [PooledSession(self, i) for i in range(max(1, size))]
+        self._ready_changed = asyncio.Event()
+
+    async def start(self):
+        for member in self.members:
+            member.start()
+        await self._wait_ready()
+
+    async def close(self):
+        await asyncio.gather(*(member.close() for member in self.members))
+
+    def has_ready(self) -> bool:
+        return any(member.ready.is_set() for member in self.members)
+
+    def notify_ready(self):
+        self._ready_changed.set()
+
+    async def _wait_ready(self) -> PooledSession:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + ACQUIRE_TIMEOUT
+        while True:
+            ready = [member for member in self.members if member.ready.is_set()]
+            if ready:
+                return min(ready, key=lambda member: member.in_flight)
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise RuntimeError(f"No healthy MCP session available for {self.url}")
+            self._ready_changed.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._ready_changed.wait(), timeout=remaining)
+
+    @contextlib.asynccontextmanager
+    async def lease(self):
+        """Borrow the least busy healthy session; sessions multiplex requests, so leases are shared."""
+        member = await self._wait_ready()
+        member.in_flight += 1
+        try:
+            yield member.session
+        finally:
+            member.in_flight -= 1
+
+
+# ─── Conversation Service ─────────────────────────────────────────────
+
+class HostService:
+    def __init__(self):
+        self.pools = {name: MCPSessionPool(url, HEADERS, SESSION_POOL_SIZE) for name, url in MCP_SERVERS.items()}
+        self.conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._active: Dict[str, int] = {}  # turns running or waiting, per conversation
+        self._last_used: Dict[str, float] = {}
+        self._limit = asyncio.Semaphore(MAX_CONVERSATIONS)
+
+    async def start(self):
+        # All servers are connected and discovered in parallel; one that is down keeps retrying
+        results = await asyncio.gather(*(pool.start() for pool in self.pools.values()), return_exceptions=True)
+        for name, result in zip(self.pools, results):
+            if isinstance(result, BaseException):
+                logger.error("MCP server '%s' is not ready yet: %s", name, result)
+        app_logger.info("Host service ready with %d MCP server(s)", len(self.pools))
+
+    async def close(self):
+        await asyncio.gather(*(pool.close() for pool in self.pools.values()))
+        await azure_client.close()
+
+    async def converse(self, conversation_id: Optional[str], prompt: str,
+                       on_token: Optional[TokenCallback] = None) -> Dict[str, Any]:
+        conversation_id = conversation_id or uuid.uuid4().hex
+        lock = self._locks.setdefault(conversation_id, asyncio.Lock())
+        self._active[conversation_id] = self._active.get(conversation_id, 0) + 1
+        try:
+            # Turns of one conversation are serialized; different conversations run concurrently.
+            # The conversation's lock comes first, so turns queued behind it do not hold
+            # MAX_CONVERSATIONS slots other conversations could use.
+            async with lock, self._limit:
+                messages = self.conversations.get(conversation_id)
+                if messages is None:
+                    messages = self.conversations[conversation_id] = Conversation(BASE_PROMPT[:1])
+                messages.append({"role": "user", "content": prompt})
+                async with contextlib.AsyncExitStack() as stack:
+                    router = ToolRouter()
+                    # Servers that are down right now are skipped instead of delaying every conversation
+                    pools = {name: pool for name, pool in self.pools.items() if pool.has_ready()} or self.pools
+                    for name, pool in pools.items():
+                        try:
+                            router.add(name, pool.url, await stack.enter_async_context(pool.lease()))
+                        except RuntimeError as e:
+                            logger.error("Skipping MCP server '%s': %s", name, e)
+                    if not router.sessions:
+                        raise RuntimeError("No MCP server is available")
+                    await router.load()
+                    reply = await answer(router, messages, on_token=on_token)
+        finally:
+            self._active[conversation_id] -= 1
+            if not self._active[conversation_id]:
+                del self._active[conversation_id]
+            self._last_used[conversation_id] = time.monotonic()
+            if conversation_id in self.conversations:
+                self.conversations.move_to_end(conversation_id)
+            self._prune(conversation_id)
+        return {"conversation_id": conversation_id, "reply": reply}
+
+    def _prune(self, current: str):
+        # Least recently used first; a conversation with a turn running or waiting is kept
+        now = time.monotonic()
+        for conversation_id in list(self.conversations):
+            if len(self.conversations) <= MAX_STORED_CONVERSATIONS \
+                    and now - self._last_used.get(conversation_id, now) < CONVERSATION_IDLE_TTL:
+                break
+            if conversation_id not in self._active:
+                self._forget(conversation_id)
+        # A first turn that failed leaves a lock but no history
+        if current not in self.conversations and current not in self._active:
+            self._forget(current)
+
+    def _forget(self, conversation_id: str):
+        self.conversations.pop(conversation_id, None)
+        self._locks.pop(conversation_id, None)
+        self._last_used.pop(conversation_id, None)
+
+
+# ─── Endpoints ────────────────────────────────────────────────────────
+
+def build_app(service: HostService) -> Starlette:
+    async def chat(request: Request):
+        try:
+            body = await request.json()
+            prompt = body["prompt"]
+        except (ValueError, KeyError):
+            return JSONResponse({"error": "expected a JSON body with a 'prompt' field"}, status_code=400)
+        if body.get("stream"):
+            return stream_reply(body.get("conversation_id") or uuid.uuid4().hex, prompt)
+        try:
+            result = await service.converse(body.get("conversation_id"), prompt)
+        except RuntimeError as e:
+            return JSONResponse({"error": str(e)}, status_code=503)
+        return JSONResponse(result)
+
+    def stream_reply(conversation_id: str, prompt: str) -> StreamingResponse:
+        # Tokens are relayed as plain text while the tool loop and final answer run
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def produce():
+            try:
+                await service.converse(conversation_id, prompt, on_token=queue.put)
+            except RuntimeError as e:
+                await queue.put(f"\n[error] {e}")
+            finally:
+                await queue.put(None)
+
+        async def tokens():
+            # Not cancelled on client disconnect, so the conversation history stays consistent
+            producer = asyncio.create_task(produce())
+            while (token := await queue.get()) is not None:
+                yield token
+            await producer
+
+        return StreamingResponse(tokens(), media_type="text/plain; charset=utf-8",
+                                 headers={"X-Conversation-Id": conversation_id})
+
+    async def health(request: Request) -> JSONResponse:
+        servers = {
+            name: {"ready_sessions": sum(member.ready.is_set() for member in pool.members), "pool_size": len(pool.members)}
+            for name, pool in service.pools.items()
+        }
+        healthy = any(server["ready_sessions"] for server in servers.values())
+        return JSONResponse({"servers": servers, "tool_cache": tool_results.stats()},
+                            status_code=200 if healthy else 503)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        await service.start()
+        try:
+            yield
+        finally:
+            await service.close()
+
+    return Starlette(
+        routes=[Route("/chat", chat, methods=["POST"]), Route("/health", health, methods=["GET"])],
+        lifespan=lifespan,
+    )
+
+
+async def serve_stdin(service: HostService):
+    # One request per line: either plain text or {"conversation_id": ..., "prompt": ...}
+    await service.start()
+    loop = asyncio.get_running_loop()
+    pending = set()
+
+    async def handle(line: str):
+        try:
+            body = json.loads(line)
+        except json.JSONDecodeError:
+            body = {"prompt": line}
+        if not isinstance(body, dict):
+            body = {"prompt": line}
+        try:
+            result = await service.converse(body.get("conversation_id"), body.get("prompt", ""))
+        except RuntimeError as e:
+            result = {"conversation_id": body.get("conversation_id"), "error": str(e)}
+        print(json.dumps(result), flush=True)
+
+    try:
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.create_task(handle(line.strip()))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    service = HostService()
+    if SERVICE_MODE == "stdin":
+        asyncio.run(serve_stdin(service))
+    else:
+        print(f"Starting MCP host service on http://{SERVICE_HOST}:{SERVICE_PORT}")
+        uvicorn.run(build_app(service), host=SERVICE_HOST, port=SERVICE_PORT)
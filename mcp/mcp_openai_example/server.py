@@ -1,6 +1,42 @@
+import os
+import zlib
+
 from mcp.server.fastmcp import FastMCP
 
-mcp = FastMCP(name="WeatherMCPServer", host="0.0.0.0", port=8080)
+from cities import load_city_index, normalize
+
+mcp = FastMCP(name="WeatherMCPServer", host=os.getenv("MCP_HOST", "0.0.0.0"), port=int(os.getenv("MCP_PORT", "8080")))
+
+# Cities are indexed once at start-up: from a GeoNames dump if CITY_DATA_PATH is set,
+# otherwise from a built-in list of large cities (see cities.py)
+city_index = load_city_index(os.getenv("CITY_DATA_PATH"))
+WEATHER_BATCH_MAX = int(os.getenv("WEATHER_BATCH_MAX", "100"))
+
+# Simulated weather data for demonstration purposes: fixed samples for a few cities and a
+# stable made-up reading for the others
+SAMPLE_WEATHER = {
+    "New York": "Sunny, 25°C",
+    "Los Angeles": "Cloudy, 22°C",
+    "Chicago": "Rainy, 18°C"
+}
+CONDITIONS = ["Sunny", "Partly cloudy", "Cloudy", "Rainy", "Windy", "Foggy"]
+
+
+def weather_for(city: str) -> str:
+    match = city_index.lookup(city)
+    if match is None:
+        return "Weather data not available for this city."
+    city_id, kind = match
+    name = city_index.names[city_id]
+    weather = SAMPLE_WEATHER.get(name)
+    if weather is None:
+        seed = zlib.crc32(city_index.describe(city_id).encode())
+        weather = f"{CONDITIONS[seed % len(CONDITIONS)]}, {seed // len(CONDITIONS) % 35 - 5}°C"
+    if kind == "exact" and normalize(city) == normalize(name):
+        return weather
+    # Say which city an alias, partial or misspelled name was taken for
+    return f"{city_index.describe(city_id)}: {weather}"
+
 
 @mcp.tool()
 def get_weather(city: str) -> str:
@@ -10,19 +46,75 @@ def get_weather(city: str) -> str:
     :param city: The name of the city to get the weather for.
     :return: A string describing the current weather in the city.
     """
-    # Simulated weather data for demonstration purposes
-    weather_data = {
-        "New York": "Sunny, 25°C",
-        "Los Angeles": "Cloudy, 22°C",
-        "Chicago": "Rainy, 18°C"
-    }
-    
-    return weather_data.get(city, "Weather data not available for this city.")
+    return weather_for(city)
+
+
+@mcp.tool()
+def get_weather_batch(cities: list[str]) -> dict[str, str]:
+    """
+    Get the current weather for several cities in one call.
+
+    :param cities: The names of the cities to get the weather for.
+    :return: The weather for each requested city, keyed by the name as given.
+    """
+    if len(cities) > WEATHER_BATCH_MAX:
+        raise ValueError(f"At most {WEATHER_BATCH_MAX} cities per call")
+    return {city: weather_for(city) for city in cities}
+
+
+# Same serving setup as hellowworld/server.py, which explains the settings
+def http_settings():
+    workers = int(os.getenv("MCP_WORKERS", "1"))
+    stateless = os.getenv("MCP_STATELESS_HTTP", "true" if workers > 1 else "false").lower() in ("1", "true", "yes")
+    json_response = os.getenv("MCP_JSON_RESPONSE", "false").lower() in ("1", "true", "yes")
+    return workers, stateless, json_response
+
+
+def create_app():
+    _, stateless, json_response = http_settings()
+    mcp.settings.stateless_http = stateless
+    mcp.settings.json_response = json_response
+    return mcp.streamable_http_app()
+
+
+def serve():
+    transport = os.getenv("MCP_TRANSPORT", "streamable-http")
+    if transport != "streamable-http":
+        mcp.run(transport=transport)
+        return
+
+    workers, stateless, _ = http_settings()
+    if workers > 1 and not stateless:
+        raise RuntimeError(
+            "MCP_WORKERS > 1 needs MCP_STATELESS_HTTP=true; for stateful sessions run one worker "
+            "per port behind a proxy that routes on the Mcp-Session-Id header"
+        )
+    if stateless:
+        print(
+            "Stateless HTTP: tools/list_changed and resource update notifications are not sent; "
+            "hosts keep their cached tool catalog until they reconnect"
+        )
+    limit = os.getenv("MCP_LIMIT_CONCURRENCY")
+
+    import uvicorn
+    uvicorn.run(
+        "server:create_app" if workers > 1 else create_app,
+        factory=True,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        workers=workers,
+        limit_concurrency=int(limit) if limit else None,
+        backlog=int(os.getenv("MCP_BACKLOG", "2048")),
+        timeout_keep_alive=int(os.getenv("MCP_KEEPALIVE_TIMEOUT", "5")),
+        timeout_graceful_shutdown=int(os.getenv("MCP_GRACEFUL_SHUTDOWN", "30")),
+        log_level=mcp.settings.log_level.lower(),
+    )
+
 
 if __name__ == "__main__":
-    import os
     transport = os.getenv("MCP_TRANSPORT", "streamable-http")
-    print(f"Starting Weather MCP server ({transport}) on 0.0.0.0:8080")
-    mcp.run(transport=transport)
+    print(f"Starting Weather MCP server ({transport}) on {mcp.settings.host}:{mcp.settings.port}")
+    serve()
 
 
@@ -1,30 +1,44 @@
 # Standard libraries
 import os
+import re
 import json
+import time
 import asyncio
+import argparse
 import datetime
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
 
+# Persistent, query-normalized cache for Bing grounding results
+from search_cache import SearchCache, normalize_query
+# Per-role model clients with latency and token accounting
+from model_clients import build_model_client, usage_table
+# Checkpoint and resume for long research runs
+from checkpoint import load_checkpoint, new_checkpoint_path, save_checkpoint, transcript_messages
+# Headless batch mode over a file of article briefs
+from batch import auto_approver, load_briefs, write_run_output
+# Incremental rendering of streamed model output
+from stream_console import StreamingConsole
+# Warm worker processes for the orchestrator's code tool
+from code_workers import CodeWorkerPool
+# Token-budgeted view of the shared thread for every agent
+from context_budget import BudgetedChatCompletionContext
+
 # Rich is used for better console output formatting
 from rich.console import Console
-from rich.text import Text
-from rich.markdown import Markdown
 
-# Azure SDK and tools
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects import AIProjectClient
+# Azure SDK and tools (async clients, so searches never block the group chat's event loop)
+from azure.identity.aio import DefaultAzureCredential
+from azure.ai.projects.aio import AIProjectClient
 from azure.ai.projects.models import MessageRole, BingGroundingTool
 
 # AutoGen-related modules for multi-agent chat
 from autogen_agentchat.agents import AssistantAgent, UserProxyAgent
 from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import BaseChatMessage, ToolCallSummaryMessage
 from autogen_agentchat.teams import SelectorGroupChat
 from autogen_agentchat.conditions import MaxMessageTermination, TextMentionTermination
-# Azure OpenAI wrapper for model communication
-from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
-from autogen_ext.code_executors.local import LocalCommandLineCodeExecutor
 from autogen_ext.tools.code_execution import PythonCodeExecutionTool
 
 # Load environment variables into a dictionary
@@ -32,164 +46,572 @@ dotenv_path = load_dotenv()
 env = {
     'project_conn': os.getenv('PROJECT_CONNECTION_STRING'),
     'bing_conn_name': os.getenv('BING_CONNECTION_NAME'),
+    'bing_conn_id': os.getenv('BING_CONNECTION_ID'),
     'azure_endpoint': os.getenv('AZURE_OPENAI_API_ENDPOINT'),
     'azure_key': os.getenv('AZURE_OPENAI_API_KEY'),
     'model_deployment': os.getenv('MODEL_DEPLOYMENT_NAME'),
     'api_version': os.getenv('AZURE_OPENAI_API_VERSION'),
+    'search_concurrency': int(os.getenv('BING_SEARCH_CONCURRENCY', '4')),
+    'search_cache_path': os.getenv('SEARCH_CACHE_PATH', 'cache/search_cache.sqlite'),
+    'search_cache_ttl': float(os.getenv('SEARCH_CACHE_TTL', '86400')),
+    'search_cache_lru_size': int(os.getenv('SEARCH_CACHE_LRU_SIZE', '256')),
+    'search_result_max_chars': int(os.getenv('SEARCH_RESULT_MAX_CHARS', '4000')),
+    'research_max_subqueries': int(os.getenv('RESEARCH_MAX_SUBQUERIES', '8')),
+    'research_brief_max_chars': int(os.getenv('RESEARCH_BRIEF_MAX_CHARS', '12000')),
+    'fast_path_selector': os.getenv('FAST_PATH_SELECTOR', 'true').lower() in ('1', 'true', 'yes'),
+    'checkpoint_dir': os.getenv('CHECKPOINT_DIR', 'checkpoints'),
+    'batch_concurrency': int(os.getenv('BATCH_CONCURRENCY', '3')),
+    'batch_output_dir': os.getenv('BATCH_OUTPUT_DIR', 'articles'),
+    'stream_tokens': os.getenv('STREAM_TOKENS', 'true').lower() in ('1', 'true', 'yes'),
+    'stream_flush_interval': float(os.getenv('STREAM_FLUSH_INTERVAL', '0.05')),
+    'context_token_budget': int(os.getenv('CONTEXT_TOKEN_BUDGET', '24000')),
+    'context_keep_recent': int(os.getenv('CONTEXT_KEEP_RECENT', '6')),
+    'context_summary_chars': int(os.getenv('CONTEXT_SUMMARY_CHARS', '300')),
+    'code_workers': int(os.getenv('CODE_WORKERS', '2')),
+    'code_worker_timeout': float(os.getenv('CODE_WORKER_TIMEOUT', '60')),
+    'code_worker_memory_mb': int(os.getenv('CODE_WORKER_MEMORY_MB', '1024')),
+    'code_worker_max_runs': int(os.getenv('CODE_WORKER_MAX_RUNS', '50')),
+    'code_worker_preload': [name.strip() for name in os.getenv('CODE_WORKER_PRELOAD', 'json,csv,re,math,statistics,datetime,pathlib,textwrap').split(',') if name.strip()],
+}
+
+# Message budget for a whole research session, including messages before a resume
+MAX_MESSAGES = 30
+
+# Model tiering: each role may use its own deployment, e.g. MODEL_DEPLOYMENT_SELECTOR for a small, fast model
+env['role_deployments'] = {
+    'selector': os.getenv('MODEL_DEPLOYMENT_SELECTOR'),
+    'web_search_agent': os.getenv('MODEL_DEPLOYMENT_WEB_SEARCH'),
+    'writer_assistant': os.getenv('MODEL_DEPLOYMENT_WRITER'),
+    'editor': os.getenv('MODEL_DEPLOYMENT_EDITOR'),
+    'verifier_agent': os.getenv('MODEL_DEPLOYMENT_VERIFIER'),
+    'orchestrator_agent': os.getenv('MODEL_DEPLOYMENT_ORCHESTRATOR'),
 }
+ROLES = list(env['role_deployments'])
+
+# Grounding instructions for the Bing search agent
+INSTRUCTIONS_PATH = 'instructions/instructions_bing_grounding.txt'
+
+# Helper function to parse and extract citation annotations.
+# The block text is kept once, with its citation markers rewritten to [n] references
+# into `sources`, which is shared across blocks and deduplicated by URL.
+def parse_annotations(block, sources):
+    text = block['text']['value'].strip()
+    refs = []
+    for ann in block['text'].get('annotations', []):
+        if ann.get('type') != 'url_citation':
+            continue
+        url = ann['url_citation'].get('url', 'No URL found')
+        title = ann['url_citation'].get('title', 'No title found')
+        ref = sources.setdefault(url, {'id': len(sources) + 1, 'title': title, 'url': url})['id']
+        if ann.get('text'):
+            text = text.replace(ann['text'], f'[{ref}]')
+        if ref not in refs:
+            refs.append(ref)
+    return {'text': text, 'sources': refs}
+
+# Serialize search results compactly and within the character budget
+# (roughly 4 characters per token): the longest answer text is trimmed first,
+# then sources are dropped from the end of the list, together with every [n]
+# marker and answer reference that points at them.
+MIN_ANSWER_CHARS = 200
+
+def format_search_results(results, max_chars):
+    answers = [dict(answer) for answer in results.get('answers', [])]
+    sources = list(results.get('sources', []))
+
+    def dump():
+        return json.dumps({'answers': answers, 'sources': sources}, ensure_ascii=False, separators=(',', ':'))
+
+    payload = dump()
+    while len(payload) > max_chars:
+        overflow = len(payload) - max_chars
+        longest = max(answers, key=lambda answer: len(answer['text']), default=None)
+        target = max(MIN_ANSWER_CHARS, len(longest['text']) - overflow - 1) if longest else 0
+        if longest and target < len(longest['text']) - 1:
+            longest['text'] = longest['text'][:target].rstrip() + '…'
+        elif sources:
+            dropped = sources.pop()['id']
+            marker = re.compile(rf'\s*\[{dropped}\]')
+            for answer in answers:
+                answer['text'] = marker.sub('', answer['text'])
+                if 'sources' in answer:
+                    answer['sources'] = [ref for ref in answer['sources'] if ref != dropped]
+        else:
+            break
+        payload = dump()
+    return payload
+
+# Long-lived Bing grounding backend: the credential, project client, connection id and
+# grounding agent are created on first use and reused by every query until close().
+# All calls go through the async SDK, and at most `search_concurrency` runs are in flight.
+class BingSearchBackend:
+    def __init__(self, concurrency: int):
+        self.credential = None
+        self.project_client = None
+        self.agent = None
+        self._init_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def _ensure_agent(self):
+        # Concurrent first searches wait here instead of each creating an agent
+        async with self._init_lock:
+            if self.agent is not None:
+                return self.agent
+
+            # Create AI project client using default Azure credentials
+            self.credential = DefaultAzureCredential()
+            try:
+                self.project_client = AIProjectClient.from_connection_string(
+                    credential=self.credential,
+                    conn_str=env['project_conn']
+                )
+
+                # Load grounding instructions for Bing tool
+                with open(INSTRUCTIONS_PATH, 'r', encoding='utf-8', errors='ignore') as f:
+                    instructions = f.read().strip()
+
+                # Create Bing grounding tool from specified connection; a known BING_CONNECTION_ID
+                # skips the management API lookup (e.g. when replaying against the local stand-in)
+                connection_id = env['bing_conn_id']
+                if not connection_id:
+                    connection_id = (await self.project_client.connections.get(connection_name=env['bing_conn_name'])).id
+                bing = BingGroundingTool(connection_id=connection_id)
+
+                # Register the shared agent with Bing tool and instructions
+                self.agent = await self.project_client.agents.create_agent(
+                    model=env['model_deployment'],
+                    name='web_search_agent',
+                    instructions=instructions,
+                    tools=bing.definitions,
+                    temperature=0.1,
+                    headers={'x-ms-enable-preview': 'true'}
+                )
+            except BaseException:
+                # Close what was opened so the next search starts from a clean slate
+                await self.close()
+                raise
+            return self.agent
+
+    async def search(self, query: str) -> list:
+        agent = await self._ensure_agent()
+
+        async with self._slots:
+            # Each query gets its own thread on the shared agent
+            thread = await self.project_client.agents.create_thread()
+            await self.project_client.agents.create_message(thread_id=thread.id, role=MessageRole.USER, content=query)
+            await self.project_client.agents.create_and_process_run(thread_id=thread.id, agent_id=agent.id)
+
+            # Retrieve the agent's response messages
+            messages = await self.project_client.agents.list_messages(thread_id=thread.id)
+            response = messages.get_last_message_by_role(MessageRole.AGENT)
+
+        # Parse and return annotated results; an empty dict means nothing worth caching came back
+        answers = []
+        sources = {}
+        if response:
+            for block in response.text_messages:
+                if block.get('type') == 'text':
+                    answers.append(parse_annotations(block, sources))
+        if not answers:
+            return {}
+        return {'answers': answers, 'sources': list(sources.values())}
+
+    async def close(self):
+        # Clean up the shared agent once, at shutdown
+        if self.agent is not None:
+            await self.project_client.agents.delete_agent(self.agent.id)
+            self.agent = None
+        if self.project_client is not None:
+            await self.project_client.close()
+            self.project_client = None
+        if self.credential is not None:
+            await self.credential.close()
+            self.credential = None
+
+search_backend = BingSearchBackend(env['search_concurrency'])
+
+# Shared by all agents and persisted across runs; every hit saves a full grounding run
+search_cache = SearchCache(env['search_cache_path'], env['search_cache_ttl'], env['search_cache_lru_size'])
+
+# Warm Python workers shared by every team's code tool (CODE_WORKERS=0 uses the local command line executor)
+code_workers = CodeWorkerPool(
+    env['code_workers'], env['code_worker_timeout'], env['code_worker_memory_mb'],
+    env['code_worker_max_runs'], env['code_worker_preload'],
+)
 
 # Asynchronous function to fetch web search snippets using Bing via Azure AI agent
 async def get_bing_snippet(query: str) -> str:
-    # Create AI project client using default Azure credentials
-    project_client = AIProjectClient.from_connection_string(
-        credential=DefaultAzureCredential(),
-        conn_str=env['project_conn']
-    )
+    results = await search_cache.get_or_search(query, search_backend.search)
+    return format_search_results(results, env['search_result_max_chars'])
 
-    # Load grounding instructions for Bing tool
-    INSTRUCTIONS_PATH = 'instructions/instructions_bing_grounding.txt'
-    with open(INSTRUCTIONS_PATH, 'r', encoding='utf-8', errors='ignore') as f:
-        INSTRUCTIONS = f.read().strip()
-
-    # Helper function to parse and extract citation annotations
-    def parse_annotations(block):
-        text = block['text']['value'].strip()
-        annotations = block['text'].get('annotations', [])
-        entries = []
-        if annotations:
-            for ann in annotations:
-                if ann.get('type') == 'url_citation':
-                    url = ann['url_citation'].get('url', 'No URL found')
-                    title = ann['url_citation'].get('title', 'No title found')
-                    entries.append({'text': text, 'url': url, 'title': title})
-        else:
-            entries.append({'text': text, 'url': 'No URL found', 'title': 'No title found'})
-        return entries
-    
-    # Create Bing grounding tool from specified connection
-    bing = BingGroundingTool(
-        connection_id=project_client.connections.get(
-            connection_name=env['bing_conn_name']
-        ).id
+# Merge the results of several searches into one brief: every source appears once
+# (deduplicated by URL) and each answer's [n] markers are renumbered to match.
+def merge_search_results(questions, results_list):
+    answers = []
+    sources = {}
+    for question, results in zip(questions, results_list):
+        # BaseException: a cancelled search comes back as CancelledError
+        if isinstance(results, BaseException):
+            answers.append({'question': question, 'text': f'Search failed: {results!r}', 'sources': []})
+            continue
+        if not results:
+            answers.append({'question': question, 'text': 'No results found.', 'sources': []})
+            continue
+        renumber = {}
+        for source in results['sources']:
+            merged = sources.setdefault(source['url'], {**source, 'id': len(sources) + 1})
+            renumber[source['id']] = merged['id']
+        for answer in results['answers']:
+            text = re.sub(r'\[(\d+)\]', lambda m: f'[{renumber.get(int(m[1]), m[1])}]', answer['text'])
+            refs = list(dict.fromkeys(renumber.get(ref, ref) for ref in answer['sources']))
+            answers.append({'question': question, 'text': text, 'sources': refs})
+    return {'answers': answers, 'sources': list(sources.values())}
+
+# Research fan-out: all sub-queries are searched at once (bounded by the backend's
+# BING_SEARCH_CONCURRENCY slots and shared through the search cache), then merged
+# into a single consolidated brief for the writer.
+async def research_questions(questions: list[str]) -> str:
+    # Sub-queries that normalize to the same search are only run once
+    unique = {}
+    for question in questions:
+        if question.strip():
+            unique.setdefault(normalize_query(question), question.strip())
+    subqueries = list(unique.values())[:env['research_max_subqueries']]
+
+    results_list = await asyncio.gather(
+        *(search_cache.get_or_search(query, search_backend.search) for query in subqueries),
+        return_exceptions=True,
     )
+    return format_search_results(merge_search_results(subqueries, results_list), env['research_brief_max_chars'])
 
-    # Register a temporary agent with Bing tool and instructions
-    agent = project_client.agents.create_agent(
-        model=env['model_deployment'],
-        name='web_search_agent',
-        instructions=INSTRUCTIONS,
-        tools=bing.definitions,
-        temperature=0.1,
-        headers={'x-ms-enable-preview': 'true'}
+# Rule-based speaker selection: picks the next speaker without an LLM call when the
+# transition is unambiguous, and returns None (model-based selection) otherwise.
+class FastPathSelector:
+    # The regular pipeline: research -> draft -> edit -> fact-check -> sign-off
+    TRANSITIONS = {
+        'web_search_agent': 'writer_assistant',
+        'writer_assistant': 'editor',
+        'editor': 'verifier_agent',
+    }
+    # How the orchestrator refers to its team when it says which condition is unmet
+    ALIASES = {
+        'writer_assistant': r'writer|rewrite',
+        'editor': r'editor',
+        'verifier_agent': r'verifier|fact[- ]check',
+        'web_search_agent': r'web_search_agent|research(?:er)?',
+        'User': r'user',
+    }
+    APPROVED = re.compile(r'\bapprov(?:e|ed|al)\b', re.IGNORECASE)
+    REJECTED = re.compile(r'\breject(?:s|ed|ion)?\b', re.IGNORECASE)
+    # "cannot approve", "won't be approved": a rejection, not an approval
+    NOT_APPROVED = re.compile(
+        r"\b(?:not|never|cannot|can['’]t|won['’]t|don['’]t|unable to)\s+(?:be\s+)?approv\w*", re.IGNORECASE
     )
+    RESEARCH = re.compile(r'\b(?:research|look up|search for)\b', re.IGNORECASE)
+
+    def __init__(self):
+        self.fast_path = 0
+        self.model_path = 0
 
-    # Create thread and submit user query to the agent
-    thread = project_client.agents.create_thread()
-    project_client.agents.create_message(thread_id=thread.id, role=MessageRole.USER, content=query)
-    project_client.agents.create_and_process_run(thread_id=thread.id, agent_id=agent.id)
+    def __call__(self, messages):
+        speaker = self._decide(messages)
+        if speaker is None:
+            self.model_path += 1
+        else:
+            self.fast_path += 1
+        return speaker
 
-    # Clean up by deleting the temporary agent
-    project_client.agents.delete_agent(agent.id)
+    def _decide(self, messages):
+        chat = [message for message in messages if isinstance(message, BaseChatMessage)]
+        if len(chat) < 2:
+            # Only the task so far: let the model open the conversation
+            return None
+        last = chat[-1]
+        content = last.content if isinstance(last.content, str) else ''
 
-    # Retrieve the agent's response messages
-    response = project_client.agents.list_messages(thread_id=thread.id).get_last_message_by_role(MessageRole.AGENT)
+        if isinstance(last, ToolCallSummaryMessage):
+            # Search results go to the writer; anyone else reflects on their own tool output
+            return 'writer_assistant' if last.source == 'web_search_agent' else last.source
 
-    # Parse and return annotated results
-    results = []
-    if response:
-        for block in response.text_messages:
-            if block.get('type') == 'text':
-                results.extend(parse_annotations(block))
+        if last.source == 'verifier_agent':
+            # Only an unambiguous verdict is routed here; a reply that both approves and
+            # rejects (or does neither) goes to the model
+            approved = bool(self.APPROVED.search(self.NOT_APPROVED.sub('', content)))
+            rejected = bool(self.REJECTED.search(content) or self.NOT_APPROVED.search(content))
+            if approved == rejected:
+                return None
+            return 'orchestrator_agent' if approved else 'writer_assistant'
 
-    return json.dumps(results, indent=2)
+        if last.source == 'orchestrator_agent':
+            # Whole words only: "editorial", "users" or "user-friendly" do not name anyone
+            named = [name for name, pattern in self.ALIASES.items()
+                     if re.search(rf'(?<![\w-])(?:{pattern})(?![\w-])', content, re.IGNORECASE)]
+            return named[0] if len(named) == 1 else None
 
-# Main orchestration logic for multi-agent workflow
-async def main():
-    console = Console()
+        if last.source == 'writer_assistant' and self.RESEARCH.search(content):
+            # The writer may be asking for research instead of handing in a draft
+            return None
 
-    model_client=AzureOpenAIChatCompletionClient(
-            model=env['model_deployment'],
-            api_version=env['api_version'],
-            azure_endpoint=env['azure_endpoint'],
-            api_key=env['azure_key'],
-            model_info={'vision': True, 'function_calling': True, 'json_output': True, 'structured_output': True, 'family': 'gpt-4o'},
+        return self.TRANSITIONS.get(last.source)
 
-    )
+    def summary(self):
+        return f'{self.fast_path} speaker selection(s) resolved by rules, {self.model_path} by the model'
 
-    # Define all assistant agents with specific roles
+# Build the research team around the given user agent; both the interactive run and
+# the batch runner use it, each with its own model clients and selector.
+# With `stream` the assistants stream their replies token by token.
+def build_team(model_clients, user_agent, work_dir, max_messages, selector, stream=False):
+    # Each agent keeps its own copy of the thread; the model only sees a view of it within the token budget
+    def budgeted_context():
+        return BudgetedChatCompletionContext(
+            env['context_token_budget'], env['context_keep_recent'], env['context_summary_chars'],
+        )
 
-    # Instantiate user proxy (simulated user interface)
-    user_proxy = UserProxyAgent('User')
+    # Define all assistant agents with specific roles
 
     web_search_agent = AssistantAgent(
         name='web_search_agent',
         description='An agent who can search the web to conduct research and answer open questions',
-        model_client=model_client,
-        system_message='You are an agent who can search the web to conduct research and answer open questions.  You can use the bing tool to search the internet for information.  You should return a list of entries with text, url, and title for each entry. Never reply with Terminate, just return the list of entries.',
-        tools=[get_bing_snippet]
+        model_client=model_clients['web_search_agent'],
+        model_client_stream=stream,
+        model_context=budgeted_context(),
+        system_message='You are an agent who can search the web to conduct research and answer open questions.  When the writer or the editor raise open questions, break them into short, focused sub-queries and call research_questions once with all of them; it searches them in parallel and returns one consolidated brief.  Use the bing tool only for a single follow-up search.  Search results come back as answers whose [n] markers refer to the numbered sources.  You should return a list of entries with text, url, and title for each entry. Never reply with Terminate, just return the list of entries.',
+        tools=[research_questions, get_bing_snippet]
     )
 
     writer_assistant = AssistantAgent(
         name='writer_assistant',
         description='A high-quality journalist agent who excels at writing a first draft of an article as well as revising the article based on feedback from the other agents',
-        model_client=model_client,
+        model_client=model_clients['writer_assistant'],
+        model_client_stream=stream,
+        model_context=budgeted_context(),
         system_message='You are a high-quality journalist agent who excels at writing a first draft of an article as well as revising the article based on feedback from the other agents.  Do not just write bullet points on how you would write the article, but actually write it.  You can also ask for research to be conducted on certain topics.'
     )
 
     editor_agent = AssistantAgent(
         name='editor',
         description='An expert editor of written articles who can read an article and make suggestions for improvements',
-        model_client=model_client,
+        model_client=model_clients['editor'],
+        model_client_stream=stream,
+        model_context=budgeted_context(),
         system_message='You are an expert editor.  You carefully read an article and make suggestions for improvements and suggest additional topics that should be researched to improve the article quality.'
     )
 
     verifier_agent = AssistantAgent(
         name='verifier_agent',
         description='A responsible agent who will verify the facts and ensure that the article is accurate and well-written',
-        model_client=model_client,
+        model_client=model_clients['verifier_agent'],
+        model_client_stream=stream,
+        model_context=budgeted_context(),
         system_message='Ensure article accuracy and approve or reject with reasons. you should use the bing tool to search the internet to verify any relevant facts. and explicitly approve or reject the article based on accuracy, giving your reasoning. You can ask for rewrites if you find inaccuracies.',
         tools=[get_bing_snippet]
     )
-    code_execution = PythonCodeExecutionTool(LocalCommandLineCodeExecutor(work_dir="coding"))
+    code_execution = PythonCodeExecutionTool(code_workers.executor(work_dir))
 
     orchestrator_agent = AssistantAgent(
         name='orchestrator_agent',
         description='Team leader who verifies when the article is complete and meets all requirements',
-        model_client=model_client,
+        model_client=model_clients['orchestrator_agent'],
+        model_client_stream=stream,
+        model_context=budgeted_context(),
         system_message="You are a leading a journalism team that conducts research to craft high-quality articles. If the article isn't well written, ask the writer for a rewrite. any article needs to be reviewed by the editor, and has been fact-checked and approved by the verifier agent, and approved by the user, then create python code to store the article to a file locally in markdown. once executed reply 'TERMINATE'.  Otherwise state what condition has not yet been met.",
         tools=[code_execution]
     )
 
     # Termination condition: look for the keyword 'TERMINATE' to end the session
     text_mention_termination = TextMentionTermination("TERMINATE")
-    max_messages_termination = MaxMessageTermination(max_messages=30)
+    max_messages_termination = MaxMessageTermination(max_messages=max(1, max_messages))
     termination = text_mention_termination | max_messages_termination
 
     # Define the group of agents that will collaborate
-    agent_team = SelectorGroupChat(
-        [writer_assistant, web_search_agent, editor_agent, verifier_agent, user_proxy, orchestrator_agent],
-        model_client=model_client,
+    return SelectorGroupChat(
+        [writer_assistant, web_search_agent, editor_agent, verifier_agent, user_agent, orchestrator_agent],
+        model_client=model_clients['selector'],
         termination_condition=termination,
         allow_repeated_speaker=True,  # Allow an agent to speak multiple turns in a row.
+        selector_func=selector,
     )
 
-    # Task prompt for the orchestrator to start the session
-    task_prompt = (
-        'Ask the user to describe the article they want. '
-        f"Today's date is {datetime.date.today()}"
-    )
+# Release the search backend, cache and code workers shared by every team in this process
+async def close_shared_resources(console):
+    await search_backend.close()
+    console.print(f'Code workers: {code_workers.summary()}')
+    await code_workers.close()
+    console.print(f'Search cache: {search_cache.summary()}')
+    search_cache.close()
 
-    # Run the session and stream outputs to the console
-    async for response in agent_team.run_stream(task=task_prompt):
-        if isinstance(response, TaskResult):
-            console.print(response.stop_reason)
-        else:
-            console.print(Text(f'{response.source}: ', style='bold magenta'), end='')
-            if isinstance(response.content, str):
-                console.print(Markdown(response.content))
+# Main orchestration logic for multi-agent workflow
+async def main(resume_path=None):
+    console = Console()
+
+    checkpoint = load_checkpoint(resume_path) if resume_path else None
+    if checkpoint and checkpoint['completed']:
+        console.print(f"Run in {resume_path} already finished: {checkpoint['stop_reason']}")
+        return
+
+    # One Azure OpenAI client per role, so deployments can be tiered and usage reported per agent
+    model_clients = {role: build_model_client(role, env) for role in ROLES}
+
+    # Warm the code workers up front so saving the article does not pay for interpreter start-up
+    await code_workers.start()
+
+    # Instantiate user proxy (simulated user interface)
+    user_proxy = UserProxyAgent('User')
+
+    # Skip the selector's LLM round trip whenever the next speaker is predictable
+    selector = FastPathSelector() if env['fast_path_selector'] else None
+
+    # Replayed messages count toward MAX_MESSAGES like new ones
+    agent_team = build_team(model_clients, user_proxy, 'coding', MAX_MESSAGES, selector, stream=env['stream_tokens'])
+
+    replaying = 0
+    if checkpoint:
+        # Continue where the checkpointed run stopped: the team starts from its transcript
+        task_prompt = checkpoint['task']
+        transcript = checkpoint['transcript']
+        checkpoint_path = resume_path
+        replaying = len(transcript)
+        stream = agent_team.run_stream(task=transcript_messages(transcript))
+        console.print(f'Resuming {resume_path} after {replaying} message(s)')
+    else:
+        # Task prompt for the orchestrator to start the session
+        task_prompt = (
+            'Ask the user to describe the article they want. '
+            f"Today's date is {datetime.date.today()}"
+        )
+        transcript = []
+        checkpoint_path = new_checkpoint_path(env['checkpoint_dir'])
+        stream = agent_team.run_stream(task=task_prompt)
+        console.print(f'Checkpointing to {checkpoint_path}')
+
+    # Run the session and stream outputs to the console as they arrive
+    output = StreamingConsole(console, env['stream_flush_interval'])
+    try:
+        async for response in stream:
+            if isinstance(response, TaskResult):
+                output.close()
+                console.print(response.stop_reason)
+                save_checkpoint(checkpoint_path, task_prompt, transcript,
+                                completed=True, stop_reason=response.stop_reason)
             else:
-                console.print(response.content)
+                if isinstance(response, BaseChatMessage):
+                    if replaying:
+                        # The team echoes the transcript it was resumed with first
+                        replaying -= 1
+                        continue
+                    # Checkpoint after every message so a crash loses at most the turn in progress
+                    transcript.append(response.model_dump(mode='json'))
+                    save_checkpoint(checkpoint_path, task_prompt, transcript)
+                output.render(response)
+    finally:
+        output.close()
+        if env['stream_tokens']:
+            console.print(f'Streaming: {output.summary()}')
+        await close_shared_resources(console)
+        if selector is not None:
+            console.print(f'Speaker selection: {selector.summary()}')
+        console.print(usage_table(model_clients.values()))
+        for client in model_clients.values():
+            await client.close()
+
+# One headless run: the same team, with the auto-approver in place of the user proxy.
+# The article is the writer's last draft; timings and usage go next to it.
+async def run_brief(brief, output_dir, slots, console):
+    run_dir = os.path.join(output_dir, brief['id'])
+    queued_at = time.perf_counter()
+    stats = {'id': brief['id'], 'title': brief['title'], 'messages': 0, 'speakers': {}}
+    article = None
+
+    async with slots:
+        started_at = time.perf_counter()
+        stats['queue_wait_seconds'] = round(started_at - queued_at, 3)
+        model_clients = {role: build_model_client(role, env) for role in ROLES}
+        selector = FastPathSelector() if env['fast_path_selector'] else None
+        user_agent = UserProxyAgent('User', description='The user who requested the article', input_func=auto_approver(brief['brief']))
+
+        task_prompt = (
+            'Ask the user to describe the article they want. '
+            f"Today's date is {datetime.date.today()}"
+        )
+        checkpoint_path = os.path.join(run_dir, 'checkpoint.json')
+        os.makedirs(run_dir, exist_ok=True)
+        transcript = []
+        console.print(f"{brief['id']}: started")
+        try:
+            agent_team = build_team(model_clients, user_agent, os.path.join(run_dir, 'coding'), MAX_MESSAGES, selector)
+            async for response in agent_team.run_stream(task=task_prompt):
+                if isinstance(response, TaskResult):
+                    stats['stop_reason'] = response.stop_reason
+                    save_checkpoint(checkpoint_path, task_prompt, transcript,
+                                    completed=True, stop_reason=response.stop_reason)
+                elif isinstance(response, BaseChatMessage):
+                    elapsed = round(time.perf_counter() - started_at, 3)
+                    stats.setdefault('first_message_seconds', elapsed)
+                    stats['messages'] += 1
+                    stats['speakers'][response.source] = stats['speakers'].get(response.source, 0) + 1
+                    if response.source == 'writer_assistant' and isinstance(response.content, str):
+                        article = response.content
+                        stats['last_draft_seconds'] = elapsed
+                    transcript.append(response.model_dump(mode='json'))
+                    save_checkpoint(checkpoint_path, task_prompt, transcript)
+        except Exception as e:
+            # A failed brief is reported in its stats and does not stop the rest of the batch
+            stats['error'] = f'{type(e).__name__}: {e}'
+        finally:
+            stats['elapsed_seconds'] = round(time.perf_counter() - started_at, 3)
+            if selector is not None:
+                stats['speaker_selection'] = selector.summary()
+            stats['usage'] = {
+                role: {key: value for key, value in vars(client.meter).items() if key != 'role'}
+                for role, client in model_clients.items()
+            }
+            for client in model_clients.values():
+                await client.close()
+
+    write_run_output(run_dir, article, stats)
+    outcome = stats.get('error') or stats.get('stop_reason')
+    console.print(f"{brief['id']}: finished in {stats['elapsed_seconds']}s after {stats['messages']} message(s): {outcome}")
+    return stats
+
+# Headless batch mode: every brief gets its own team; at most `concurrency` teams run at once
+# and all of them share the search backend, its concurrency limit and the search cache.
+async def run_batch(briefs_path, output_dir, concurrency):
+    console = Console()
+    briefs = load_briefs(briefs_path)
+    slots = asyncio.Semaphore(concurrency)
+    console.print(f'Running {len(briefs)} brief(s) from {briefs_path}, {concurrency} at a time')
+    # summary.json is written even when no brief got as far as creating its own directory
+    os.makedirs(output_dir, exist_ok=True)
+
+    started_at = time.perf_counter()
+    try:
+        await code_workers.start()
+        runs = await asyncio.gather(*(run_brief(brief, output_dir, slots, console) for brief in briefs))
+    finally:
+        await close_shared_resources(console)
+
+    summary = {
+        'briefs': len(briefs),
+        'concurrency': concurrency,
+        'articles': sum(1 for run in runs if os.path.exists(os.path.join(output_dir, run['id'], 'article.md'))),
+        'failed': [run['id'] for run in runs if 'error' in run],
+        'elapsed_seconds': round(time.perf_counter() - started_at, 3),
+        'search_cache': search_cache.summary(),
+        'runs': runs,
+    }
+    with open(os.path.join(output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, default=str)
+    console.print(f"{summary['articles']}/{len(briefs)} article(s) written to {output_dir} in {summary['elapsed_seconds']}s")
 
 # Entry point for the script
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Multi-agent research team')
+    parser.add_argument('--resume', metavar='CHECKPOINT', help='resume the run saved in this checkpoint file')
+    parser.add_argument('--batch', metavar='BRIEFS', help='run headless over the article briefs in this JSONL file')
+    parser.add_argument('--output', default=env['batch_output_dir'], help='output directory for --batch')
+    parser.add_argument('--concurrency', type=int, default=env['batch_concurrency'], help='teams running at once in --batch')
+    args = parser.parse_args()
+    if args.batch:
+        asyncio.run(run_batch(args.batch, args.output, max(1, args.concurrency)))
+    else:
+        asyncio.run(main(args.resume))
@@ -0,0 +1,55 @@
+# Headless batch mode: article briefs are read from a JSONL file, the user is
+# replaced by an auto-approver, and every finished run writes its article and
+# timing stats to its own directory under the output directory.
+
+import os
+import re
+import json
+
+
+def load_briefs(path):
+    # One brief per line, e.g. {"id": "...", "title": "...", "brief": "..."};
+    # request-style lines ({"request_id", "title", "body"}) are accepted as well
+    briefs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            text = entry.get('brief') or entry.get('body') or ''
+            title = entry.get('title', '')
+            if not text and not title:
+                raise ValueError(f'{path}:{line_number}: brief has neither a title nor a body')
+            run_id = str(entry.get('id') or entry.get('request_id') or f'brief-{line_number:03d}')
+            briefs.append({
+                'id': re.sub(r'[^\w.-]+', '_', run_id),
+                'title': title,
+                'brief': f'{title}\n\n{text}'.strip(),
+            })
+    return briefs
+
+
+def auto_approver(brief):
+    # Stands in for UserProxyAgent's stdin prompt: the first request for input is
+    # answered with the brief, every later one (sign-off, clarifications) is approved
+    replies = []
+
+    async def input_func(prompt, cancellation_token=None):
+        if not replies:
+            reply = f'Please write an article based on this brief:\n\n{brief}'
+        else:
+            reply = 'I approve the article. Use your best judgement on anything that is still open.'
+        replies.append(reply)
+        return reply
+
+    return input_func
+
+
+def write_run_output(run_dir, article, stats):
+    os.makedirs(run_dir, exist_ok=True)
+    if article:
+        with open(os.path.join(run_dir, 'article.md'), 'w', encoding='utf-8') as f:
+            f.write(article)
+    with open(os.path.join(run_dir, 'stats.json'), 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2, default=str)
@@ -0,0 +1,53 @@
+# Local checkpoints for long research runs. After every message the transcript (every
+# chat message so far) is written to disk, so a crashed or interrupted run can resume
+# without repeating the model and search calls it has already paid for.
+#
+# The team's own state is not saved: the group chat keeps running while a message is
+# handled, so a snapshot taken mid-run can have the manager's thread ahead of an agent's
+# buffer or model context (AutoGen 0.4.9 warns about this). The transcript is always
+# consistent, and a resumed run starts a fresh team with it as the task, so every agent
+# sees the whole conversation again; only the agents' private tool-call steps, which the
+# transcript records as summaries, are not restored.
+
+import os
+import json
+import uuid
+import datetime
+
+from pydantic import TypeAdapter
+from autogen_agentchat.messages import ChatMessage
+
+_chat_messages = TypeAdapter(list[ChatMessage])
+
+
+def new_checkpoint_path(directory):
+    os.makedirs(directory, exist_ok=True)
+    # The random suffix keeps runs started in the same second (batch mode) apart
+    run_id = f"{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    return os.path.join(directory, f'research-{run_id}.json')
+
+
+def load_checkpoint(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def transcript_messages(transcript):
+    # Chat messages to start the resumed team with
+    return _chat_messages.validate_python(transcript)
+
+
+def save_checkpoint(path, task, transcript, completed=False, stop_reason=None):
+    checkpoint = {
+        'task': task,
+        'saved_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'message_count': len(transcript),
+        'completed': completed,
+        'stop_reason': stop_reason,
+        'transcript': transcript,
+    }
+    # Write to a temporary file first so a crash mid-write never corrupts the last good checkpoint
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, default=str)
+    os.replace(tmp_path, path)
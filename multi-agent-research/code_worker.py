@@ -0,0 +1,90 @@
+# Warm Python worker for the orchestrator's code tool (see code_workers.py).
+# The worker imports the common modules once, then forks a fresh child for every
+# script it is given: the child starts with an empty __main__, its own working
+# directory, memory limit and output file, so no state carries over between runs
+# while the interpreter start-up and module imports are paid only once.
+#
+# Protocol (JSON lines): the worker prints {"ready": ...} on start-up; for each job
+# read from stdin it prints {"pid": <child pid>} and then {"exit_code": <code>}.
+
+import os
+import sys
+import json
+import runpy
+import importlib
+import traceback
+
+
+def send(message):
+    sys.stdout.write(json.dumps(message) + '\n')
+    sys.stdout.flush()
+
+
+def preload(modules):
+    loaded = []
+    for name in modules:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception:
+            # Optional packages (numpy, pandas, ...) are only preloaded when installed
+            pass
+    return loaded
+
+
+def run_child(job):
+    exit_code = 0
+    try:
+        # stdout and stderr go to the job's output file (never to the protocol pipe),
+        # stdin is closed like for a background script
+        output = os.open(job['output_path'], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(output, 1)
+        os.dup2(output, 2)
+        sys.stdout.reconfigure(line_buffering=True)
+
+        os.chdir(job['work_dir'])
+        if job.get('memory_limit'):
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (job['memory_limit'], job['memory_limit']))
+
+        # Same view of the world as `python <script>`
+        sys.argv = [job['path']]
+        sys.path.insert(0, os.path.dirname(job['path']))
+        runpy.run_path(job['path'], run_name='__main__')
+    except SystemExit as e:
+        if isinstance(e.code, int):
+            exit_code = e.code
+        elif e.code is not None:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as e:
+        # Report the traceback from the script's own frames, as `python <script>` would
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != job['path']:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb or e.__traceback__)
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(exit_code)
+
+
+def serve(modules):
+    send({'ready': True, 'pid': os.getpid(), 'preloaded': preload(modules)})
+    for line in sys.stdin:
+        job = json.loads(line)
+        pid = os.fork()
+        if pid == 0:
+            run_child(job)
+        send({'pid': pid})
+        _, status = os.waitpid(pid, 0)
+        send({'exit_code': os.waitstatus_to_exitcode(status)})
+
+
+if __name__ == '__main__':
+    serve([name for name in sys.argv[1].split(',') if name] if len(sys.argv) > 1 else [])
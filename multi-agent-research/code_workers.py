@@ -0,0 +1,221 @@
+# Pool of warm Python workers behind the orchestrator's code tool.
+# LocalCommandLineCodeExecutor starts a new interpreter for every execution; here a
+# few long-lived workers (code_worker.py) import the common modules once and fork a
+# fresh child per script, so each run is still isolated but starts in milliseconds.
+# Every run has a timeout and a memory limit, and a worker is replaced after
+# `max_runs` executions. Platforms without os.fork fall back to the local executor.
+
+import os
+import sys
+import json
+import shutil
+import signal
+import asyncio
+import tempfile
+from hashlib import sha256
+
+from autogen_core.code_executor import CodeExecutor, CodeResult
+from autogen_ext.code_executors.local import LocalCommandLineCodeExecutor
+
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code_worker.py')
+PYTHON_LANGUAGES = ('python', 'py', 'python3')
+WARM_WORKERS_SUPPORTED = hasattr(os, 'fork')
+SPAWN_ATTEMPTS = 3
+
+
+class _Worker:
+    def __init__(self, process, preloaded):
+        self.process = process
+        self.preloaded = preloaded
+        self.runs = 0
+
+    async def send(self, message):
+        self.process.stdin.write((json.dumps(message) + '\n').encode())
+        await self.process.stdin.drain()
+
+    async def receive(self):
+        line = await self.process.stdout.readline()
+        if not line:
+            raise RuntimeError(f'code worker {self.process.pid} exited')
+        return json.loads(line)
+
+    async def kill(self):
+        if self.process.returncode is None:
+            self.process.kill()
+        await self.process.wait()
+
+
+class CodeWorkerPool:
+    def __init__(self, size, timeout, memory_limit_mb, max_runs, preload):
+        self.size = size
+        self.timeout = timeout
+        self.memory_limit = memory_limit_mb * 1024 * 1024 if memory_limit_mb else None
+        self.max_runs = max_runs
+        self.preload = preload
+        self.enabled = size > 0 and WARM_WORKERS_SUPPORTED
+        self.idle = None
+        self.workers = set()
+        self.output_dir = None
+        self._start_lock = asyncio.Lock()
+        self.stats = {'runs': 0, 'timeouts': 0, 'failures': 0, 'spawned': 0, 'recycled': 0, 'spawn_failures': 0}
+
+    def executor(self, work_dir):
+        # One executor per team (it owns the work directory); all of them share the workers
+        if not self.enabled:
+            return LocalCommandLineCodeExecutor(work_dir=work_dir, timeout=self.timeout)
+        return WarmPythonCodeExecutor(self, work_dir)
+
+    async def start(self):
+        # Idempotent; called up front so the workers are warm before the first execution
+        if not self.enabled:
+            return
+        async with self._start_lock:
+            if self.idle is not None:
+                return
+            self.output_dir = tempfile.mkdtemp(prefix='code-workers-')
+            self.idle = asyncio.Queue()
+            for worker in await asyncio.gather(*(self._spawn() for _ in range(self.size))):
+                self.idle.put_nowait(worker)
+
+    async def _spawn(self):
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_PATH, ','.join(self.preload),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        )
+        worker = _Worker(process, [])
+        try:
+            worker.preloaded = (await worker.receive())['preloaded']
+        except BaseException:
+            await worker.kill()
+            raise
+        self.workers.add(worker)
+        self.stats['spawned'] += 1
+        return worker
+
+    async def _release(self, worker, healthy):
+        # Recycle workers that misbehaved, died or reached their run budget
+        if healthy and worker.process.returncode is None and worker.runs < self.max_runs:
+            self.idle.put_nowait(worker)
+            return
+        self.workers.discard(worker)
+        await worker.kill()
+        self.stats['recycled'] += 1
+        for attempt in range(SPAWN_ATTEMPTS):
+            try:
+                self.idle.put_nowait(await self._spawn())
+                return
+            except Exception as e:
+                error = e
+                await asyncio.sleep(0.5 * 2 ** attempt)
+        # The pool shrinks by one; once no worker is left, callers get the error
+        # instead of waiting for a worker that will never come
+        self.stats['spawn_failures'] += 1
+        if not self.workers:
+            self.idle.put_nowait(RuntimeError(f'no code worker could be started: {error}'))
+
+    async def run(self, path, work_dir, cancellation_token):
+        await self.start()
+        worker = await self.idle.get()
+        if isinstance(worker, Exception):
+            # Left in the queue for every later caller
+            self.idle.put_nowait(worker)
+            raise worker
+        output_path = os.path.join(self.output_dir, f'{worker.process.pid}.out')
+        healthy = False
+        child = None
+        try:
+            worker.runs += 1
+            self.stats['runs'] += 1
+            await worker.send({
+                'path': path,
+                'work_dir': work_dir,
+                'output_path': output_path,
+                'memory_limit': self.memory_limit,
+            })
+            child = (await worker.receive())['pid']
+
+            result = asyncio.ensure_future(worker.receive())
+            if cancellation_token is not None:
+                cancellation_token.link_future(result)
+            try:
+                exit_code = (await asyncio.wait_for(asyncio.shield(result), self.timeout))['exit_code']
+                timed_out = False
+            except asyncio.TimeoutError:
+                # Kill the child only; the worker reports its exit and stays warm
+                try:
+                    os.kill(child, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                await result
+                exit_code = 124
+                timed_out = True
+                self.stats['timeouts'] += 1
+            healthy = True
+
+            with open(output_path, 'r', encoding='utf-8', errors='replace') as f:
+                output = f.read()
+            if timed_out:
+                output += '\nTimeout'
+            return exit_code, output
+        except asyncio.CancelledError:
+            if child is not None:
+                try:
+                    os.kill(child, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            raise
+        except Exception:
+            self.stats['failures'] += 1
+            raise
+        finally:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            await self._release(worker, healthy)
+
+    async def close(self):
+        for worker in list(self.workers):
+            await worker.kill()
+        self.workers.clear()
+        self.idle = None
+        if self.output_dir is not None:
+            # Output files of runs that were killed mid-way may be left behind
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+            self.output_dir = None
+
+    def summary(self):
+        if not self.enabled:
+            return 'disabled, using the local command line executor'
+        return f'{self.size} warm worker(s), {self.stats}'
+
+
+class WarmPythonCodeExecutor(CodeExecutor):
+    def __init__(self, pool, work_dir):
+        self.pool = pool
+        self.work_dir = os.path.abspath(work_dir)
+        os.makedirs(self.work_dir, exist_ok=True)
+
+    async def execute_code_blocks(self, code_blocks, cancellation_token):
+        # Same contract as LocalCommandLineCodeExecutor: scripts are saved to the work
+        # directory, outputs are concatenated and execution stops at the first failure
+        output = ''
+        exit_code = 0
+        for block in code_blocks:
+            language = block.language.lower()
+            if language not in PYTHON_LANGUAGES:
+                exit_code = 1
+                output += f'\nunknown language {language}'
+                break
+
+            path = os.path.join(self.work_dir, f'tmp_code_{sha256(block.code.encode()).hexdigest()}.py')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(block.code)
+
+            exit_code, block_output = await self.pool.run(path, self.work_dir, cancellation_token)
+            output += block_output
+            if exit_code != 0:
+                break
+        return CodeResult(exit_code=exit_code, output=output)
+
+    async def restart(self):
+        # Every execution already runs in a fresh process; there is no per-team state to reset
+        pass
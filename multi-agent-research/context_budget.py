@@ -0,0 +1,135 @@
+# Token-budgeted model context for the research agents. Every agent in the group
+# chat receives the whole shared thread, so without a bound each call resends every
+# earlier draft and search dump. This context keeps the full history (and saves it
+# in checkpoints), but hands the model a compacted view:
+#   - the last `keep_recent` messages verbatim,
+#   - older drafts replaced by a note once a newer draft from the same agent exists,
+#   - older tool results and search dumps cut down to a short excerpt,
+#   - the oldest remaining messages dropped while the view is over `budget` tokens.
+# Messages from the user and each agent's newest draft are never dropped, so reviewers
+# always see the article they are reviewing. Token counts are computed once per message.
+
+from autogen_core.model_context import ChatCompletionContext
+from autogen_core.models import AssistantMessage, FunctionExecutionResultMessage
+
+# Messages shorter than this are never treated as drafts
+DRAFT_MIN_CHARS = 1500
+PINNED_SOURCES = ('user', 'User')
+
+_encoding = None
+
+
+def count_tokens(text):
+    # tiktoken ships with autogen-ext's OpenAI client; fall back to ~4 characters per token
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('o200k_base')
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def message_text(message):
+    if isinstance(message, FunctionExecutionResultMessage):
+        return ''.join(result.content for result in message.content)
+    if isinstance(message.content, str):
+        return message.content
+    return ''.join(item if isinstance(item, str) else str(item) for item in message.content)
+
+
+def message_tokens(message):
+    # A few tokens of per-message overhead on top of the content
+    return count_tokens(message_text(message)) + 4
+
+
+def excerpt(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    return f'{text[:max_chars].rstrip()}… [{len(text) - max_chars} more characters omitted]'
+
+
+class BudgetedChatCompletionContext(ChatCompletionContext):
+    def __init__(self, budget, keep_recent, summary_chars, draft_sources=('writer_assistant',),
+                 tool_sources=('web_search_agent',)):
+        super().__init__()
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.summary_chars = summary_chars
+        self.draft_sources = draft_sources
+        self.tool_sources = tool_sources
+        self._tokens = []
+
+    async def add_message(self, message):
+        await super().add_message(message)
+        self._tokens.append(message_tokens(message))
+
+    async def clear(self):
+        await super().clear()
+        self._tokens = []
+
+    async def load_state(self, state):
+        await super().load_state(state)
+        self._tokens = [message_tokens(message) for message in self._messages]
+
+    def _is_draft(self, message):
+        return (
+            getattr(message, 'source', None) in self.draft_sources
+            and isinstance(message.content, str)
+            and len(message.content) >= DRAFT_MIN_CHARS
+        )
+
+    def _compact(self, message, superseded):
+        # Returns the message to send in place of an older one, or None to keep it as is
+        if superseded:
+            return message.model_copy(update={'content': f'[Earlier draft by {message.source} omitted; a later draft follows.]'})
+        if isinstance(message, FunctionExecutionResultMessage):
+            if any(len(result.content) > self.summary_chars for result in message.content):
+                return message.model_copy(update={'content': [
+                    result.model_copy(update={'content': excerpt(result.content, self.summary_chars)})
+                    for result in message.content
+                ]})
+            return None
+        if getattr(message, 'source', None) in self.tool_sources and isinstance(message.content, str) \
+                and len(message.content) > self.summary_chars:
+            return message.model_copy(update={'content': excerpt(message.content, self.summary_chars)})
+        return None
+
+    async def get_messages(self):
+        count = len(self._messages)
+        recent_start = max(0, count - self.keep_recent)
+
+        # Newest draft per agent; any older draft from the same agent is superseded
+        latest_draft = {}
+        for index, message in enumerate(self._messages):
+            if self._is_draft(message):
+                latest_draft[message.source] = index
+
+        view = []
+        for index, message in enumerate(self._messages):
+            tokens = self._tokens[index]
+            if index < recent_start:
+                superseded = self._is_draft(message) and latest_draft[message.source] != index
+                compacted = self._compact(message, superseded)
+                if compacted is not None:
+                    message, tokens = compacted, message_tokens(compacted)
+            view.append([index, message, tokens])
+
+        # Drop the oldest unpinned messages outside the recent window until the view fits;
+        # a function call is dropped together with its results so no result is orphaned
+        pinned = set(latest_draft.values())
+        total = sum(tokens for _, _, tokens in view)
+        position = 0
+        while total > self.budget and position < len(view) and view[position][0] < recent_start:
+            message = view[position][1]
+            if getattr(message, 'source', None) in PINNED_SOURCES or view[position][0] in pinned:
+                position += 1
+                continue
+            total -= view.pop(position)[2]
+            if isinstance(message, AssistantMessage) and not isinstance(message.content, str) \
+                    and position < len(view) and isinstance(view[position][1], FunctionExecutionResultMessage):
+                total -= view.pop(position)[2]
+        return [message for _, message, _ in view]
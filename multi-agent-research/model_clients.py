@@ -0,0 +1,123 @@
+# Per-role Azure OpenAI model clients with latency and token accounting.
+# Every role (agent or selector) gets its own client, so each can point at a
+# different deployment and its usage can be reported separately.
+
+import re
+import time
+
+import httpx
+from rich.table import Table
+
+from autogen_core.models import CreateResult
+from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
+
+MODEL_INFO = {'vision': True, 'function_calling': True, 'json_output': True, 'structured_output': True, 'family': 'gpt-4o'}
+
+# Only the tail of a completion body is kept: the usage block comes last in both
+# JSON responses and streamed (include_usage) responses
+_CACHED_TOKENS = re.compile(rb'"cached_tokens"\s*:\s*(\d+)')
+_TAIL_BYTES = 4096
+
+
+class UsageMeter:
+    def __init__(self, role, deployment):
+        self.role = role
+        self.deployment = deployment
+        self.calls = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, latency, result):
+        self.calls += 1
+        self.latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        if result is not None and result.usage is not None:
+            self.prompt_tokens += result.usage.prompt_tokens
+            self.completion_tokens += result.usage.completion_tokens
+
+    def record_body_tail(self, tail):
+        # autogen's RequestUsage has no cached-token field, so it is read off the raw response
+        match = _CACHED_TOKENS.search(tail)
+        if match:
+            self.cached_tokens += int(match.group(1))
+
+
+class _TailRecordingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, meter):
+        self._stream = stream
+        self._meter = meter
+        self._tail = b''
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._tail = (self._tail + chunk)[-_TAIL_BYTES:]
+            yield chunk
+
+    async def aclose(self):
+        await self._stream.aclose()
+        self._meter.record_body_tail(self._tail)
+
+
+def _metering_http_client(meter):
+    async def on_response(response):
+        if response.request.url.path.endswith('/chat/completions'):
+            response.stream = _TailRecordingStream(response.stream, meter)
+    return httpx.AsyncClient(event_hooks={'response': [on_response]}, timeout=httpx.Timeout(600.0, connect=10.0))
+
+
+class MeteredAzureOpenAIChatCompletionClient(AzureOpenAIChatCompletionClient):
+    def __init__(self, meter, **kwargs):
+        super().__init__(http_client=_metering_http_client(meter), **kwargs)
+        self.meter = meter
+
+    async def create(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = await super().create(*args, **kwargs)
+            return result
+        finally:
+            self.meter.record(time.perf_counter() - start, result)
+
+    async def create_stream(self, *args, **kwargs):
+        # Ask for the usage chunk so streamed calls are accounted for as well
+        kwargs['extra_create_args'] = {'stream_options': {'include_usage': True}, **kwargs.get('extra_create_args', {})}
+        start = time.perf_counter()
+        result = None
+        try:
+            async for item in super().create_stream(*args, **kwargs):
+                if isinstance(item, CreateResult):
+                    result = item
+                yield item
+        finally:
+            self.meter.record(time.perf_counter() - start, result)
+
+
+def build_model_client(role, env):
+    # MODEL_DEPLOYMENT_<ROLE> picks the deployment for a role; MODEL_DEPLOYMENT_NAME is the default
+    deployment = env['role_deployments'].get(role) or env['model_deployment']
+    return MeteredAzureOpenAIChatCompletionClient(
+        UsageMeter(role, deployment),
+        model=deployment,
+        api_version=env['api_version'],
+        azure_endpoint=env['azure_endpoint'],
+        api_key=env['azure_key'],
+        model_info=MODEL_INFO,
+    )
+
+
+def usage_table(clients):
+    table = Table(title='Model usage per role')
+    for column in ('role', 'deployment', 'calls', 'avg latency (s)', 'max latency (s)', 'prompt tokens', 'cached tokens', 'completion tokens'):
+        table.add_column(column, justify='left' if column in ('role', 'deployment') else 'right')
+    for client in clients:
+        meter = client.meter
+        average = meter.latency / meter.calls if meter.calls else 0.0
+        table.add_row(
+            meter.role, meter.deployment, str(meter.calls), f'{average:.2f}', f'{meter.max_latency:.2f}',
+            str(meter.prompt_tokens), str(meter.cached_tokens), str(meter.completion_tokens),
+        )
+    return table
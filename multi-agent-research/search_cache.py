@@ -0,0 +1,170 @@
+# Persistent cache for Bing grounding results shared by the research agents.
+# Queries are normalized before lookup so that re-phrasings which only differ in
+# case, whitespace, filler words or date format hit the same entry.
+
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import datetime
+from collections import OrderedDict
+
+# Shape of the cached search results; bump it whenever that shape changes so entries
+# written by an older version are searched again instead of being returned
+# 1: list of results, 2: {'answers': [...], 'sources': [...]}
+RESULTS_FORMAT = 2
+
+# Only words whose removal cannot change what is being asked: articles and the phrasing
+# of a request. Interrogatives, negations, conjunctions, prepositions, quantifiers and
+# tensed verbs all stay ("who won" and "what won", "was" and "is" are different searches).
+STOP_WORDS = {
+    'a', 'an', 'the', 'please', 'you', 'me', 'find', 'search', 'look', 'tell', 'give', 'provide',
+    'information', 'info', 'do', 'does',
+}
+
+MONTHS = {
+    name: index
+    for index, names in enumerate([
+        ('january', 'jan'), ('february', 'feb'), ('march', 'mar'), ('april', 'apr'), ('may',), ('june', 'jun'),
+        ('july', 'jul'), ('august', 'aug'), ('september', 'sep', 'sept'), ('october', 'oct'),
+        ('november', 'nov'), ('december', 'dec'),
+    ], start=1)
+    for name in names
+}
+_MONTH_PATTERN = '|'.join(sorted(MONTHS, key=len, reverse=True))
+
+# "June 20th, 2025" / "20 June 2025" / "2025-06-20" / "06/20/2025"
+_MONTH_DAY_YEAR = re.compile(rf'\b({_MONTH_PATTERN})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?,?\s+(\d{{4}})\b')
+_DAY_MONTH_YEAR = re.compile(rf'\b(\d{{1,2}})(?:st|nd|rd|th)?\s+({_MONTH_PATTERN})\.?,?\s+(\d{{4}})\b')
+_MONTH_YEAR = re.compile(rf'\b({_MONTH_PATTERN})\.?,?\s+(\d{{4}})\b')
+_ISO_DATE = re.compile(r'\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b')
+_US_DATE = re.compile(r'\b(\d{1,2})/(\d{1,2})/(\d{4})\b')
+
+
+def _iso(year, month, day=None):
+    try:
+        if day is None:
+            return f'{int(year):04d}-{int(month):02d}'
+        return datetime.date(int(year), int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def normalize_dates(text: str, today: datetime.date) -> str:
+    # Relative dates are pinned to the calendar, so "today" means a different entry tomorrow
+    text = re.sub(r'\btoday\b', today.isoformat(), text)
+    text = re.sub(r'\byesterday\b', (today - datetime.timedelta(days=1)).isoformat(), text)
+    text = re.sub(r'\bthis year\b', str(today.year), text)
+    text = re.sub(r'\blast year\b', str(today.year - 1), text)
+
+    text = _MONTH_DAY_YEAR.sub(lambda m: _iso(m[3], MONTHS[m[1]], m[2]) or m[0], text)
+    text = _DAY_MONTH_YEAR.sub(lambda m: _iso(m[3], MONTHS[m[2]], m[1]) or m[0], text)
+    text = _MONTH_YEAR.sub(lambda m: _iso(m[2], MONTHS[m[1]]) or m[0], text)
+    text = _ISO_DATE.sub(lambda m: _iso(m[1], m[2], m[3]) or m[0], text)
+    text = _US_DATE.sub(lambda m: _iso(m[3], m[1], m[2]) or m[0], text)
+    return text
+
+
+def normalize_query(query: str, today: datetime.date = None) -> str:
+    text = normalize_dates(query.lower(), today or datetime.date.today())
+    # Keep ISO dates intact, drop every other punctuation mark
+    tokens = re.findall(r'\d{4}-\d{2}(?:-\d{2})?|[\w]+', text)
+    return ' '.join(token for token in tokens if token not in STOP_WORDS)
+
+
+class SearchCache:
+    def __init__(self, path: str, ttl: float, lru_size: int):
+        self.ttl = ttl
+        self.lru_size = lru_size
+        self.lru = OrderedDict()
+        self.inflight = {}
+        self.stats = {'lru_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0, 'shared': 0}
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS search_cache ('
+            'key TEXT PRIMARY KEY, query TEXT NOT NULL, results TEXT NOT NULL, created_at REAL NOT NULL, '
+            'format INTEGER NOT NULL DEFAULT 1)'
+        )
+        columns = [row[1] for row in self.db.execute('PRAGMA table_info(search_cache)')]
+        if 'format' not in columns:
+            # Caches created before the format column existed hold format 1 entries
+            self.db.execute('ALTER TABLE search_cache ADD COLUMN format INTEGER NOT NULL DEFAULT 1')
+        self.db.commit()
+
+    def _remember(self, key, created_at, results):
+        self.lru[key] = (created_at, results)
+        self.lru.move_to_end(key)
+        while len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        entry = self.lru.get(key)
+        if entry is not None and now - entry[0] <= self.ttl:
+            self.lru.move_to_end(key)
+            self.stats['lru_hits'] += 1
+            return entry[1]
+
+        row = self.db.execute(
+            'SELECT results, created_at FROM search_cache WHERE key = ? AND format = ?', (key, RESULTS_FORMAT)
+        ).fetchone()
+        if row is not None:
+            if now - row[1] <= self.ttl:
+                results = json.loads(row[0])
+                self._remember(key, row[1], results)
+                self.stats['disk_hits'] += 1
+                return results
+            self.stats['expired'] += 1
+        return None
+
+    def put(self, key, query, results):
+        created_at = time.time()
+        self.db.execute(
+            'INSERT OR REPLACE INTO search_cache (key, query, results, created_at, format) VALUES (?, ?, ?, ?, ?)',
+            (key, query, json.dumps(results), created_at, RESULTS_FORMAT),
+        )
+        self.db.commit()
+        self._remember(key, created_at, results)
+
+    async def get_or_search(self, query, search):
+        key = normalize_query(query)
+        results = self.get(key)
+        if results is not None:
+            return results
+
+        # Identical searches issued concurrently (e.g. by the researcher and the verifier) share one run
+        if key in self.inflight:
+            self.stats['shared'] += 1
+            return await asyncio.shield(self.inflight[key])
+
+        self.stats['misses'] += 1
+        # The search runs as its own task, so cancelling the caller that started it does not
+        # cancel it for the callers sharing it; its result is still cached
+        task = asyncio.ensure_future(self._search(key, query, search))
+        self.inflight[key] = task
+        task.add_done_callback(lambda task: self._finished(key, task))
+        return await asyncio.shield(task)
+
+    async def _search(self, key, query, search):
+        results = await search(query)
+        if results:
+            self.put(key, query, results)
+        return results
+
+    def _finished(self, key, task):
+        del self.inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when nobody was left waiting on it
+            task.exception()
+
+    def summary(self):
+        hits = self.stats['lru_hits'] + self.stats['disk_hits'] + self.stats['shared']
+        lookups = hits + self.stats['misses']
+        return {**self.stats, 'hit_rate': round(hits / lookups, 3) if lookups else 0.0}
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,70 @@
+# Incremental console rendering for the research team. Streamed model output is
+# written to the terminal as plain text while it arrives, buffered and flushed at
+# most every `flush_interval` seconds, and never re-parsed as Markdown once the
+# full message lands. Messages that were not streamed (user input, tool calls and
+# their summaries) are printed whole, as before.
+
+import time
+
+from rich.text import Text
+from rich.markdown import Markdown
+
+from autogen_agentchat.messages import ModelClientStreamingChunkEvent
+
+
+class StreamingConsole:
+    def __init__(self, console, flush_interval):
+        self.console = console
+        self.flush_interval = flush_interval
+        self.source = None  # agent whose message is currently being streamed
+        self.buffer = []
+        self.last_flush = 0.0
+        self.flushes = 0
+        self.chunks = 0
+
+    def _header(self, source):
+        self.console.print(Text(f'{source}: ', style='bold magenta'), end='')
+
+    def _flush(self):
+        if self.buffer:
+            self.console.print(''.join(self.buffer), end='', markup=False, highlight=False, soft_wrap=True)
+            self.buffer.clear()
+            self.flushes += 1
+        self.last_flush = time.monotonic()
+
+    def _end_stream(self):
+        if self.source is not None:
+            self._flush()
+            self.console.print()
+            self.source = None
+
+    def render(self, response):
+        if isinstance(response, ModelClientStreamingChunkEvent):
+            if response.source != self.source:
+                self._end_stream()
+                self._header(response.source)
+                self.source = response.source
+                self.last_flush = time.monotonic()
+            self.buffer.append(response.content)
+            self.chunks += 1
+            if time.monotonic() - self.last_flush >= self.flush_interval:
+                self._flush()
+            return
+
+        if response.source == self.source and isinstance(response.content, str):
+            # The completed message repeats what has just been streamed
+            self._end_stream()
+            return
+
+        self._end_stream()
+        self._header(response.source)
+        if isinstance(response.content, str):
+            self.console.print(Markdown(response.content))
+        else:
+            self.console.print(response.content)
+
+    def close(self):
+        self._end_stream()
+
+    def summary(self):
+        return f'{self.chunks} streamed chunk(s) rendered in {self.flushes} repaint(s)'
@@ -0,0 +1,50 @@
+import asyncio
+
+from autogen_core.models import AssistantMessage, UserMessage
+
+from context_budget import DRAFT_MIN_CHARS, BudgetedChatCompletionContext
+
+
+def draft(version):
+    text = f'Draft {version}: grid-scale batteries are spreading quickly. '
+    return AssistantMessage(source='writer_assistant', content=text * (DRAFT_MIN_CHARS // len(text) + 1))
+
+
+def view(messages, budget, keep_recent):
+    async def run():
+        context = BudgetedChatCompletionContext(budget=budget, keep_recent=keep_recent, summary_chars=300)
+        for message in messages:
+            await context.add_message(message)
+        return await context.get_messages()
+    return asyncio.run(run())
+
+
+def test_keeps_the_newest_draft_outside_the_recent_window():
+    task = UserMessage(source='user', content='Write an article about grid storage.')
+    latest = draft(2)
+    messages = [
+        task,
+        draft(1),
+        AssistantMessage(source='editor', content='Tighten the intro and cite the capacity figures. ' * 4),
+        latest,
+        AssistantMessage(source='editor', content='Better. The second section still needs a source. ' * 4),
+        AssistantMessage(source='verifier_agent', content='Checking the figures against the sources.'),
+        AssistantMessage(source='orchestrator_agent', content='Verifier, please finish the review.'),
+    ]
+    result = view(messages, budget=400, keep_recent=2)
+    assert result[0] == task
+    assert latest in result
+    # Older turns go first: the superseded draft and the editor's notes
+    assert [message.source for message in result] == ['user', 'writer_assistant', 'verifier_agent', 'orchestrator_agent']
+
+
+def test_older_drafts_are_replaced_by_a_note():
+    messages = [
+        UserMessage(source='user', content='Write an article about grid storage.'),
+        draft(1),
+        draft(2),
+        AssistantMessage(source='editor', content='Looks good.'),
+    ]
+    result = view(messages, budget=100000, keep_recent=1)
+    assert result[1].content.startswith('[Earlier draft by writer_assistant omitted')
+    assert result[2] == messages[2]
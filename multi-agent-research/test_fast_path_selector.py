@@ -0,0 +1,45 @@
+import pytest
+from autogen_agentchat.messages import TextMessage
+
+from MultiAgentResearch_autogen_aiagent_v2 import FastPathSelector
+
+
+def verdict(text):
+    messages = [
+        TextMessage(source='User', content='Write an article about grid storage.'),
+        TextMessage(source='verifier_agent', content=text),
+    ]
+    return FastPathSelector()(messages)
+
+
+@pytest.mark.parametrize('text', [
+    'Approved. All claims check out.',
+    'I approve this article.',
+])
+def test_approval_goes_to_the_orchestrator(text):
+    assert verdict(text) == 'orchestrator_agent'
+
+
+@pytest.mark.parametrize('text', [
+    'Rejected: the capacity figures are wrong.',
+    'This draft cannot be approved as written.',
+    'I cannot approve this article; several claims are inaccurate.',
+    "I can't approve this yet.",
+    'I can’t approve this yet.',
+    'I do not approve of the sourcing.',
+    "I don't approve this draft.",
+    "I won't approve it until the figures are fixed.",
+    'I am unable to approve this article.',
+    'I will never approve unsourced numbers.',
+])
+def test_rejection_goes_to_the_writer(text):
+    assert verdict(text) == 'writer_assistant'
+
+
+@pytest.mark.parametrize('text', [
+    'Approved, though I would not reject the framing.',
+    'Two figures need a second source.',
+    'I cannot approve the intro, but the rest is approved.',
+])
+def test_ambiguous_verdicts_go_to_the_model(text):
+    assert verdict(text) is None
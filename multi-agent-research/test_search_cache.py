@@ -0,0 +1,17 @@
+import datetime
+
+from search_cache import normalize_query
+
+TODAY = datetime.date(2025, 6, 20)
+
+
+def test_request_phrasing_and_dates_share_a_key():
+    assert normalize_query('Please search the battery prices today', TODAY) == \
+        normalize_query('battery prices June 20th, 2025', TODAY) == 'battery prices 2025-06-20'
+
+
+def test_words_that_change_the_question_are_kept():
+    assert normalize_query('Who won the election?', TODAY) != normalize_query('What won the election', TODAY)
+    assert normalize_query('Who is the mayor of Paris', TODAY) != normalize_query('Who was the mayor of Paris', TODAY)
+    assert normalize_query('Is coffee not bad for you', TODAY) != normalize_query('Is coffee bad for you', TODAY)
+    assert normalize_query('cats and dogs', TODAY) != normalize_query('cats or dogs', TODAY)
@@ -0,0 +1,22 @@
+import json
+
+from MultiAgentResearch_autogen_aiagent_v2 import format_search_results
+
+
+def test_dropped_sources_leave_no_references_behind():
+    results = {
+        'answers': [
+            {'text': 'Grid storage doubled in 2024 [1] and prices fell [2][3].', 'sources': [1, 2, 3]},
+            {'text': 'Most new capacity is lithium iron phosphate [3].', 'sources': [3]},
+        ],
+        'sources': [
+            {'id': ref, 'title': f'Source {ref}', 'url': f'https://example.com/{ref}/' + 'x' * 80}
+            for ref in (1, 2, 3)
+        ],
+    }
+    full = len(format_search_results(results, 100000))
+    payload = json.loads(format_search_results(results, full - 60))
+
+    assert [source['id'] for source in payload['sources']] == [1, 2]
+    assert payload['answers'][0] == {'text': 'Grid storage doubled in 2024 [1] and prices fell [2].', 'sources': [1, 2]}
+    assert payload['answers'][1] == {'text': 'Most new capacity is lithium iron phosphate.', 'sources': []}
@@ -0,0 +1,266 @@
+import os
+import re
+import json
+import time
+import random
+import codecs
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+import uvicorn
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+# Local stand-in for Azure OpenAI and the Azure AI Foundry agents API (Bing grounding).
+#
+# record: every request is forwarded to the real service and the exchange is appended
+#         to the cassette, including the timing of each streamed chunk.
+# replay: requests are answered from the cassette, deterministically and offline, with
+#         optional extra latency, scaled or fixed chunk timing and injected 429s.
+#
+# The scripts are pointed at it through their usual settings: AZURE_OPENAI_API_ENDPOINT
+# for chat completions, the host part of PROJECT_CONNECTION_STRING for the agents API,
+# and IDENTITY_ENDPOINT / IDENTITY_HEADER so DefaultAzureCredential gets a token from
+# this server instead of Entra ID when replaying.
+
+load_dotenv(".env")
+
+REPLAY_MODE = os.getenv("REPLAY_MODE", "replay")
+CASSETTE_PATH = os.getenv("REPLAY_CASSETTE", "cassettes/default.jsonl")
+HOST = os.getenv("REPLAY_HOST", "127.0.0.1")
+PORT = int(os.getenv("REPLAY_PORT", "8765"))
+# The agents SDK only talks https, so the agents API needs a certificate the client trusts
+SSL_CERTFILE = os.getenv("REPLAY_SSL_CERTFILE") or None
+SSL_KEYFILE = os.getenv("REPLAY_SSL_KEYFILE") or None
+
+# Where recorded traffic goes: /openai/... to Azure OpenAI, everything else to the project host
+OPENAI_UPSTREAM = os.getenv("REPLAY_OPENAI_UPSTREAM", "").rstrip("/")
+PROJECT_UPSTREAM = os.getenv("REPLAY_PROJECT_UPSTREAM", "").rstrip("/")
+
+# Replay timing: recorded delays are multiplied by TIME_SCALE (0 = as fast as possible),
+# EXTRA_LATENCY is added before every response, CHUNK_INTERVAL (if set) replaces the
+# recorded gaps between streamed chunks
+TIME_SCALE = float(os.getenv("REPLAY_TIME_SCALE", "1.0"))
+EXTRA_LATENCY = float(os.getenv("REPLAY_EXTRA_LATENCY", "0"))
+CHUNK_INTERVAL = float(os.getenv("REPLAY_CHUNK_INTERVAL")) if os.getenv("REPLAY_CHUNK_INTERVAL") else None
+
+# Injected throttling: this share of API requests is answered with 429 + Retry-After,
+# from a seeded generator so a replay run is repeatable
+RATE_LIMIT_RATE = float(os.getenv("REPLAY_429_RATE", "0"))
+RETRY_AFTER = os.getenv("REPLAY_RETRY_AFTER", "1")
+SEED = int(os.getenv("REPLAY_SEED", "0"))
+
+# Response headers worth keeping; everything else (auth, request ids, encodings) is dropped
+KEPT_HEADERS = ("content-type", "retry-after", "operation-location", "location")
+
+logger = logging.getLogger("replay")
+logger.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s: %(message)s"))
+logger.addHandler(handler)
+
+# Project-scoped paths embed the subscription, resource group and project name from the
+# connection string; they are normalized so a cassette replays under any connection string
+_PROJECT_SCOPE = re.compile(
+    r"/subscriptions/[^/]+/resourceGroups/[^/]+/providers/Microsoft\.MachineLearningServices/workspaces/[^/]+",
+    re.IGNORECASE,
+)
+
+
+def normalize_path(path: str) -> str:
+    return _PROJECT_SCOPE.sub("/subscriptions/-/resourceGroups/-/providers/Microsoft.MachineLearningServices/workspaces/-", path)
+
+
+def body_key(body: bytes) -> str:
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode()
+    except ValueError:
+        canonical = body
+    return hashlib.sha256(canonical).hexdigest()
+
+
+class Cassette:
+    """Recorded exchanges, matched on method, normalized path, query and body.
+
+    Identical requests (e.g. polling a run) are answered in recorded order and the
+    last answer repeats once they run out. Requests whose body differs from every
+    recording (a new date in the prompt, say) fall back to the next unused exchange
+    on the same method and path.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: List[Dict[str, Any]] = []
+        self.by_route: Dict[str, List[Dict[str, Any]]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(json.loads(line))
+        self.stats = {"recorded": 0, "replayed": 0, "fallbacks": 0, "repeats": 0, "misses": 0, "throttled": 0}
+
+    @staticmethod
+    def route(method: str, path: str) -> str:
+        return f"{method} {normalize_path(path)}"
+
+    def _index(self, entry: Dict[str, Any]):
+        entry["used"] = False
+        self.entries.append(entry)
+        request = entry["request"]
+        self.by_route.setdefault(self.route(request["method"], request["path"]), []).append(entry)
+
+    def match(self, method: str, path: str, query: str, body: bytes) -> Optional[Dict[str, Any]]:
+        candidates = self.by_route.get(self.route(method, path), [])
+        key = body_key(body)
+        exact = [entry for entry in candidates if entry["request"]["query"] == query and entry["request"]["body_key"] == key]
+        for entry in exact:
+            if not entry["used"]:
+                entry["used"] = True
+                self.stats["replayed"] += 1
+                return entry
+        if exact:
+            self.stats["repeats"] += 1
+            return exact[-1]
+        for entry in candidates:
+            if not entry["used"]:
+                entry["used"] = True
+                self.stats["fallbacks"] += 1
+                return entry
+        if candidates:
+            self.stats["repeats"] += 1
+            return candidates[-1]
+        self.stats["misses"] += 1
+        return None
+
+    def record(self, entry: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._index(entry)
+        self.stats["recorded"] += 1
+
+
+cassette = Cassette(CASSETTE_PATH)
+throttle_rng = random.Random(SEED)
+upstream_client = httpx.AsyncClient(timeout=httpx.Timeout(600.0, connect=10.0))
+
+
+# ─── Endpoints ────────────────────────────────────────────────────────
+
+async def managed_identity_token(request: Request):
+    # App Service managed identity protocol, which DefaultAzureCredential tries when
+    # IDENTITY_ENDPOINT and IDENTITY_HEADER are set; the token is never checked here
+    return JSONResponse({
+        "access_token": "replay-token",
+        "expires_on": str(int(time.time()) + 3600),
+        "resource": request.query_params.get("resource", ""),
+        "token_type": "Bearer",
+    })
+
+
+async def stats(request: Request):
+    return JSONResponse({"mode": REPLAY_MODE, "cassette": CASSETTE_PATH, "entries": len(cassette.entries), **cassette.stats})
+
+
+async def record(request: Request, path: str, query: str, body: bytes):
+    upstream = OPENAI_UPSTREAM if path.startswith("/openai/") else PROJECT_UPSTREAM
+    if not upstream:
+        return JSONResponse({"error": {"code": "NoUpstream", "message": f"No upstream configured for {path}"}}, status_code=502)
+
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in ("host", "content-length", "accept-encoding")}
+    started = time.perf_counter()
+    upstream_request = upstream_client.build_request(
+        request.method, upstream + path + (f"?{query}" if query else ""), headers=headers, content=body,
+    )
+    response = await upstream_client.send(upstream_request, stream=True)
+    latency = time.perf_counter() - started
+    kept = {k: v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS}
+    streaming = response.headers.get("content-type", "").startswith("text/event-stream")
+
+    entry: Dict[str, Any] = {
+        "request": {"method": request.method, "path": path, "query": query, "body_key": body_key(body),
+                    "body": body.decode("utf-8", errors="replace")},
+        "response": {"status": response.status_code, "headers": kept, "latency": round(latency, 4)},
+    }
+
+    async def relay():
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        chunks: List[List[Any]] = []
+        try:
+            async for chunk in response.aiter_bytes():
+                chunks.append([round(time.perf_counter() - started - latency, 4), decoder.decode(chunk)])
+                yield chunk
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                chunks.append([round(time.perf_counter() - started - latency, 4), tail])
+        finally:
+            await response.aclose()
+        # Only complete exchanges go into the cassette
+        if streaming:
+            entry["response"]["chunks"] = chunks
+        else:
+            entry["response"]["body"] = "".join(text for _, text in chunks)
+        cassette.record(entry)
+        logger.info("Recorded %s %s -> %d", request.method, path, response.status_code)
+
+    return StreamingResponse(relay(), status_code=response.status_code, headers=kept)
+
+
+async def replay(request: Request, path: str, query: str, body: bytes):
+    if RATE_LIMIT_RATE and throttle_rng.random() < RATE_LIMIT_RATE:
+        cassette.stats["throttled"] += 1
+        return JSONResponse(
+            {"error": {"code": "429", "message": f"Rate limit is exceeded. Try again in {RETRY_AFTER} seconds."}},
+            status_code=429, headers={"retry-after": RETRY_AFTER},
+        )
+
+    entry = cassette.match(request.method, path, query, body)
+    if entry is None:
+        logger.warning("No recorded exchange for %s %s", request.method, path)
+        return JSONResponse({"error": {"code": "NotRecorded", "message": f"No recorded exchange for {request.method} {path}"}},
+                            status_code=404)
+
+    recorded = entry["response"]
+    await asyncio.sleep(EXTRA_LATENCY + recorded["latency"] * TIME_SCALE)
+    if "chunks" not in recorded:
+        return Response(recorded["body"], status_code=recorded["status"], headers=recorded["headers"])
+
+    async def chunks():
+        previous = 0.0
+        for offset, text in recorded["chunks"]:
+            delay = CHUNK_INTERVAL if CHUNK_INTERVAL is not None else (offset - previous) * TIME_SCALE
+            previous = offset
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield text.encode("utf-8")
+
+    return StreamingResponse(chunks(), status_code=recorded["status"], headers=recorded["headers"])
+
+
+async def proxy(request: Request):
+    path = request.url.path
+    query = request.url.query
+    body = await request.body()
+    if REPLAY_MODE == "record":
+        return await record(request, path, query, body)
+    return await replay(request, path, query, body)
+
+
+app = Starlette(routes=[
+    Route("/msi/token", managed_identity_token, methods=["GET"]),
+    Route("/replay/stats", stats, methods=["GET"]),
+    Route("/{path:path}", proxy, methods=["GET", "POST", "PUT", "PATCH", "DELETE"]),
+])
+
+
+if __name__ == "__main__":
+    if REPLAY_MODE not in ("record", "replay"):
+        raise RuntimeError(f"REPLAY_MODE must be 'record' or 'replay', got '{REPLAY_MODE}'")
+    logger.info("%s mode, cassette %s (%d exchange(s))", REPLAY_MODE, CASSETTE_PATH, len(cassette.entries))
+    uvicorn.run(app, host=HOST, port=PORT, ssl_certfile=SSL_CERTFILE, ssl_keyfile=SSL_KEYFILE, log_level="warning")
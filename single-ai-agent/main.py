@@ -41,6 +41,8 @@ AGENT_NAME = "Web Search Agent"
 API_DEPLOYMENT_NAME = os.getenv("MODEL_DEPLOYMENT_NAME")
 PROJECT_CONNECTION_STRING = os.environ["PROJECT_CONNECTION_STRING"]
 BING_CONNECTION_NAME = os.getenv("BING_CONNECTION_NAME")
+# Optional: a known connection id skips the management API lookup (e.g. when replaying offline)
+BING_CONNECTION_ID = os.getenv("BING_CONNECTION_ID")
 MAX_COMPLETION_TOKENS = 4096
 MAX_PROMPT_TOKENS = 10240
 TEMPERATURE = 0.1
@@ -57,8 +59,11 @@ INSTRUCTIONS_FILE_PATH = INSTRUCTIONS_FILE
 with open(INSTRUCTIONS_FILE_PATH, "r", encoding="utf-8", errors="ignore") as file:
     instructions = file.read()
 
-bing_connection = project_client.connections.get(connection_name=BING_CONNECTION_NAME)
-conn_id = bing_connection.id
+if BING_CONNECTION_ID:
+    conn_id = BING_CONNECTION_ID
+else:
+    bing_connection = project_client.connections.get(connection_name=BING_CONNECTION_NAME)
+    conn_id = bing_connection.id
 
 # Initialize agent bing tool and add the connection id
 bing = BingGroundingTool(connection_id=conn_id)